@@ -0,0 +1,139 @@
+"""Load benchmarks against the in-process FakeHelix server.
+
+Measures throughput and per-request p50/p99 latency for bulk subscription creation, a full
+subscription sync, cleanup of non-enabled subscriptions and Conduits.start(), at each scale.
+
+    python benchmarks/helix.py [--scales 1000 10000 100000] [--latency 0.002] [--error-rate 0.01]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+# Run from a checkout without installing: put the repository root on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitchconduits import Conduits, FakeHelix, RateLimiter, RequestHooks, RetryPolicy
+
+
+class LatencyRecorder(RequestHooks):
+    """Keeps every request attempt's latency for percentiles"""
+    def __init__(self):
+        self.latencies = []
+        self.retries = 0
+
+    def request_finished(self, method, endpoint, status, elapsed):
+        self.latencies.append(elapsed)
+
+    def request_retried(self, method, endpoint, reason):
+        self.retries += 1
+
+    def percentile(self, q):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_helix(args, count):
+    return FakeHelix(rate_limit=args.rate_limit, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, max_total_cost=count * 2 + 1, seed=1)
+
+
+async def make_conduits(helix, recorder):
+    conduits = Conduits("client", "secret", "https://example.com/callback/", client=helix.client(),
+                        rate_limiter=RateLimiter(limit=helix.rate_limit), metrics=recorder,
+                        retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01))
+    await conduits.get_access_token()
+    return conduits
+
+
+async def bench_bulk_create(args, count, recorder):
+    helix = make_helix(args, count)
+    helix.add_conduit(1)
+    conduits = await make_conduits(helix, recorder)
+    await conduits.get_conduits()
+    pairs = (("stream.online", {"broadcaster_user_id": str(i)}) for i in range(count))
+    failed = 0
+    async for result in conduits.conduits[0].bulk_create_subscriptions(pairs, concurrency=args.concurrency):
+        failed += not result.success
+    await conduits.aclose()
+    return count, failed
+
+
+async def bench_full_sync(args, count, recorder):
+    helix = make_helix(args, count)
+    helix.add_subscriptions(count)
+    conduits = await make_conduits(helix, recorder)
+    await conduits.sync_subscriptions()
+    await conduits.aclose()
+    return len(conduits.subscriptions), count - len(conduits.subscriptions)
+
+
+async def bench_cleanup(args, count, recorder):
+    helix = make_helix(args, count)
+    helix.add_subscriptions(count // 2)
+    helix.add_subscriptions(count - count // 2, status="authorization_revoked", start=count)
+    conduits = await make_conduits(helix, recorder)
+    report = await conduits.clean_up_subscriptions(concurrency=args.concurrency)
+    await conduits.aclose()
+    return len(report.deleted_ids), len(report.failed_ids)
+
+
+async def bench_start(args, count, recorder):
+    helix = make_helix(args, count)
+    conduit = helix.add_conduit(args.shards)
+    for shard_id in range(args.shards):
+        helix.shards[conduit["id"]][str(shard_id)] = {
+            "id": str(shard_id), "status": "enabled",
+            "transport": {"method": "webhook", "callback": f"https://example.com/callback/{shard_id:064x}"}
+        }
+    helix.add_subscriptions(count, conduit_id=conduit["id"])
+    conduits = Conduits("client", "secret", "https://example.com/callback/", client=helix.client(),
+                        rate_limiter=RateLimiter(limit=helix.rate_limit), metrics=recorder)
+    await conduits.start()
+    await conduits.aclose()
+    return len(conduits.subscriptions), 0
+
+
+SCENARIOS = {
+    "bulk_create": bench_bulk_create,
+    "full_sync": bench_full_sync,
+    "cleanup": bench_cleanup,
+    "start": bench_start,
+}
+
+
+async def run(args):
+    print(f"{'scenario':<12} {'scale':>8} {'items':>8} {'failed':>7} {'seconds':>9} {'items/s':>10} "
+          f"{'requests':>9} {'retries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.scenarios:
+        for count in args.scales:
+            recorder = LatencyRecorder()
+            started = time.perf_counter()
+            items, failed = await SCENARIOS[name](args, count, recorder)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<12} {count:>8} {items:>8} {failed:>7} {elapsed:>9.2f} {items / elapsed:>10,.0f} "
+                  f"{len(recorder.latencies):>9} {recorder.retries:>8} {recorder.percentile(0.5) * 1000:>8.2f} "
+                  f"{recorder.percentile(0.99) * 1000:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 503")
+    parser.add_argument("--rate-limit", type=int, default=1000000, help="Helix points per minute")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
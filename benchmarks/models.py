@@ -0,0 +1,100 @@
+"""Memory and serialization micro-benchmark for the model classes.
+
+Compares the slotted Subscription/Shard models against their former dict-backed layout, and
+the stdlib json module against twitchconduits.jsonutil (orjson when installed).
+
+    python benchmarks/models.py [count]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Run from a checkout without installing: put the repository root on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitchconduits import Subscription, Shard, Transport
+from twitchconduits.jsonutil import loads, dumps, ORJSON_AVAILABLE
+
+TYPES = ["stream.online", "stream.offline", "channel.update", "channel.follow"]
+
+
+class DictSubscription:
+    """The Subscription layout before __slots__, for comparison"""
+    def __init__(self, sub_id, user_id, subscription_type=None, version=None, condition=None, status=None,
+                 cost=None, created_at=None):
+        self.id = sub_id
+        self.user_id = user_id
+        self.type = subscription_type
+        self.version = version
+        self.condition = condition or {}
+        self.status = status
+        self.cost = cost
+        self.created_at = created_at
+
+
+def helix_page(count):
+    return {
+        "data": [
+            {"id": f"{i:08x}-0000-0000-0000-000000000000", "status": "enabled", "type": TYPES[i % len(TYPES)],
+             "version": "1", "condition": {"broadcaster_user_id": str(100000 + i)}, "cost": 0,
+             "created_at": "2024-01-01T00:00:00.000000000Z",
+             "transport": {"method": "conduit", "conduit_id": "bfcfc993-26b1-b876-44d9-afe75a379dac"}}
+            for i in range(count)
+        ],
+        "total": count, "total_cost": 0, "max_total_cost": 10000, "pagination": {}
+    }
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return objects, size / len(objects)
+
+
+def throughput(label, func, count, repeat=3):
+    best = min(timeit(func) for _ in range(repeat))
+    print(f"  {label:<34} {count / best:>12,.0f} /s")
+
+
+def timeit(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main(count=100000):
+    body = json.dumps(helix_page(count)).encode()
+    print(f"{count:,} subscriptions, orjson {'available' if ORJSON_AVAILABLE else 'not installed'}")
+
+    print("Memory per object (including parsed fields):")
+    _, size = measure_memory(lambda: [
+        DictSubscription(d["id"], d["condition"]["broadcaster_user_id"], d["type"], d["version"], d["condition"],
+                         d["status"], d["cost"], d["created_at"])
+        for d in loads(body)["data"]])
+    print(f"  {'dict-backed Subscription':<34} {size:>10,.0f} B")
+    _, size = measure_memory(lambda: [Subscription.from_api(d) for d in loads(body)["data"]])
+    print(f"  {'slotted Subscription.from_api':<34} {size:>10,.0f} B")
+    _, size = measure_memory(lambda: [Shard(str(i), "t", "https://cb/", transport=Transport("https://cb/", secret=str(i)))
+                                      for i in range(count)])
+    print(f"  {'Shard + Transport':<34} {size:>10,.0f} B")
+
+    print("Throughput:")
+    throughput("json.loads page", lambda: json.loads(body), count)
+    throughput("jsonutil.loads page", lambda: loads(body), count)
+    data = loads(body)["data"]
+    throughput("Subscription.from_api", lambda: [Subscription.from_api(d) for d in data], count)
+    subscriptions = [Subscription.from_api(d) for d in data]
+    throughput("Subscription.to_dict", lambda: [s.to_dict() for s in subscriptions], count)
+    dicts = [s.to_dict() for s in subscriptions]
+    throughput("json.dumps", lambda: json.dumps(dicts).encode(), count)
+    throughput("jsonutil.dumps", lambda: dumps(dicts), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
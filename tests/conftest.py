@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The package is used from a checkout without installing it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twitchconduits import Conduits, FakeHelix, RateLimiter, RetryPolicy  # noqa: E402
+
+
+@pytest.fixture
+def helix():
+    return FakeHelix(rate_limit=1000000)
+
+
+@pytest.fixture
+def make_conduits(helix):
+    """Build a Conduits manager served by the fake, with fast retries"""
+    def make(**kwargs):
+        kwargs.setdefault("rate_limiter", RateLimiter(limit=1000000))
+        kwargs.setdefault("retry_policy", RetryPolicy(base_delay=0.001))
+        return Conduits("client", "secret", "https://example.com/callback/", client=helix.client(), **kwargs)
+    return make
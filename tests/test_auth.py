@@ -0,0 +1,17 @@
+import asyncio
+
+
+def test_revoked_app_token_is_refreshed_once_and_replayed(helix, make_conduits):
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            await manager.create_conduit()
+            refreshes = manager.token_manager.refreshes
+            helix.tokens.clear()
+            results = await asyncio.gather(*(manager.get_conduits() for _ in range(10)))
+            return manager, refreshes, results
+
+    manager, refreshes, results = asyncio.run(run())
+    assert all(len(conduits) == 1 for conduits in results)
+    assert manager.token_manager.refreshes == refreshes + 1
+    assert manager.access_token in helix.tokens
@@ -0,0 +1,39 @@
+import asyncio
+
+from twitchconduits import FakeHelix, ShardAutoscaler
+
+
+def scale_up_with_failing_shard_updates(helix, make_conduits, update_shards):
+    helix.routes = {**FakeHelix.routes, ("PATCH", "/helix/eventsub/conduits/shards"): update_shards}
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            conduit = await manager.create_conduit(1)
+            autoscaler = ShardAutoscaler(conduit, target_rate=1, window=1, up_after=1, cooldown=0)
+            for _ in range(5):
+                autoscaler.record("0", 0.0)
+            return conduit, await autoscaler.evaluate()
+
+    return asyncio.run(run())
+
+
+def test_scale_up_rolls_back_when_shard_updates_fail(helix, make_conduits):
+    def update_shards(fake, params, body):
+        return 500, {"error": "Internal Server Error", "status": 500, "message": ""}
+
+    conduit, changed = scale_up_with_failing_shard_updates(helix, make_conduits, update_shards)
+    assert changed is None
+    assert conduit.shard_count == 1
+    assert helix.conduits[conduit.id]["shard_count"] == 1
+
+
+def test_scale_up_rolls_back_when_shards_cannot_be_assigned(helix, make_conduits):
+    def update_shards(fake, params, body):
+        errors = [{"id": shard["id"], "message": "nope", "code": "invalid_parameter"} for shard in body["shards"]]
+        return 202, {"data": [], "errors": errors}
+
+    conduit, changed = scale_up_with_failing_shard_updates(helix, make_conduits, update_shards)
+    assert changed is None
+    assert conduit.shard_count == 1
+    assert helix.conduits[conduit.id]["shard_count"] == 1
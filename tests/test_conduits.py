@@ -0,0 +1,32 @@
+import asyncio
+
+from twitchconduits import FakeHelix
+
+
+def test_create_shards_retries_reported_errors(helix, make_conduits):
+    failures = {"2": 1}
+
+    def update_shards(fake, params, body):
+        status, response = FakeHelix._update_shards(fake, params, body)
+        for shard in list(response["data"]):
+            if failures.get(shard["id"]):
+                failures[shard["id"]] -= 1
+                response["data"].remove(shard)
+                response["errors"].append({"id": shard["id"], "message": "try again", "code": "internal_error"})
+        return status, response
+
+    helix.routes = {**FakeHelix.routes, ("PATCH", "/helix/eventsub/conduits/shards"): update_shards}
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            conduit = await manager.create_conduit(0)
+            shards, errors = await conduit.create_shards([f"key{i}" for i in range(4)])
+            return conduit, shards, errors
+
+    conduit, shards, errors = asyncio.run(run())
+    assert not errors
+    assert conduit.shard_count == 4
+    assert [shard.id for shard in shards] == ["0", "1", "2", "3"]
+    assert all(shard.status == "enabled" for shard in shards)
+    assert set(conduit.shards_dict) == {shard.transport.secret for shard in shards}
@@ -0,0 +1,58 @@
+import asyncio
+from collections import defaultdict
+
+from twitchconduits import HashRing
+
+TYPES = ("stream.online", "stream.offline", "channel.update")
+
+
+def items(broadcasters):
+    return [(subscription_type, {"broadcaster_user_id": str(i)}) for i in broadcasters for subscription_type in TYPES]
+
+
+def conduits_by_broadcaster(manager):
+    placed = defaultdict(set)
+    for subscription in manager.subscriptions.by_id.values():
+        placed[subscription.condition["broadcaster_user_id"]].add(subscription.conduit_id)
+    return placed
+
+
+def test_hash_ring_only_moves_keys_to_the_new_node():
+    ring = HashRing(["a", "b", "c"])
+    before = {str(key): ring.get(str(key)) for key in range(1000)}
+    ring.add("d")
+    moved = [key for key, node in before.items() if ring.get(key) != node]
+    assert moved and all(ring.get(key) == "d" for key in moved)
+
+
+def test_placement_is_stable_and_keeps_broadcasters_together(helix, make_conduits):
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            for _ in range(3):
+                await manager.create_conduit()
+            async for result in manager.bulk_create_subscriptions(items(range(300)), concurrency=50):
+                assert result.success, result.error
+            steady = await manager.rebalance(dry_run=True)
+            placed = conduits_by_broadcaster(manager)
+
+            added = await manager.create_conduit()
+            grown = await manager.rebalance()
+            after_grow = await manager.rebalance(dry_run=True)
+
+            on_added = sum(s.conduit_id == added.id for s in manager.subscriptions.by_id.values())
+            manager.placement.drain(added.id)
+            drained = await manager.rebalance()
+            return manager, steady, placed, grown, after_grow, on_added, drained, added
+
+    manager, steady, placed, grown, after_grow, on_added, drained, added = asyncio.run(run())
+    assert not steady.moves
+    assert all(len(conduits) == 1 for conduits in placed.values())
+    assert grown.moved and not grown.failed
+    assert len(grown.moves) < len(manager.subscriptions) / 2
+    assert not after_grow.moves
+    assert on_added and len(drained.moved) == on_added
+    assert all(len(conduits) == 1 for conduits in conduits_by_broadcaster(manager).values())
+    assert added.id not in {s.conduit_id for s in manager.subscriptions.by_id.values()}
+    counts = manager.placement.counts
+    assert max(counts.values()) <= manager.placement.load_factor * sum(counts.values()) / len(counts) + len(TYPES)
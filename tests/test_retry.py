@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import httpx
+
+from twitchconduits import RateLimiter, RetryPolicy, send_request
+
+
+def test_429_is_retried_past_the_deadline():
+    policy = RetryPolicy(deadline=30.0)
+    response = httpx.Response(429, headers={"Ratelimit-Reset": str(int(time.time()) + 45)})
+    delay = policy.next_delay("POST", 1, time.monotonic() - 29, response=response, rate_limited=1)
+    assert 40 < delay <= 45
+
+
+def test_429_retries_have_their_own_budget():
+    policy = RetryPolicy(max_rate_limit_retries=2)
+    response = httpx.Response(429, headers={"Ratelimit-Reset": "0"})
+    assert policy.next_delay("GET", 1, time.monotonic(), response=response, rate_limited=2) == 0
+    assert policy.next_delay("GET", 1, time.monotonic(), response=response, rate_limited=3) is None
+
+
+def test_5xx_respects_the_deadline():
+    policy = RetryPolicy(deadline=1.0)
+    response = httpx.Response(503)
+    assert policy.next_delay("GET", 1, time.monotonic(), response=response) is not None
+    assert policy.next_delay("GET", 1, time.monotonic() - 2, response=response) is None
+
+
+def test_429s_do_not_use_up_attempts(caplog):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= 4:
+            return httpx.Response(429, headers={"Ratelimit-Reset": "0"})
+        return httpx.Response(200, json={})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_request("POST", "https://api.twitch.tv/helix/x", {}, client=client,
+                                      retry_policy=RetryPolicy(max_attempts=2))
+
+    assert asyncio.run(run()).status_code == 200
+    assert len(calls) == 5
+    assert "rate limited, retrying at reset (4/10)" in caplog.text
+    assert "attempt 0/" not in caplog.text
+
+
+def test_429_with_points_left_is_not_retried():
+    calls = []
+    limiter = RateLimiter()
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Ratelimit-Remaining": "750",
+                                            "Ratelimit-Reset": str(int(time.time()) + 60)})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_request("POST", "https://api.twitch.tv/helix/x", {}, client=client, limiter=limiter)
+
+    assert asyncio.run(run()).status_code == 429
+    assert len(calls) == 1
+    assert limiter.blocked_until == 0.0
+
+
+def test_create_over_the_cost_cap_fails_fast(helix, make_conduits):
+    helix.max_total_cost = 0
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.get_access_token()
+            conduit = await manager.create_conduit()
+            started = time.monotonic()
+            response = await conduit.create_subscription("stream.online", {"broadcaster_user_id": "1"})
+            return manager, response, time.monotonic() - started
+
+    manager, response, elapsed = asyncio.run(run())
+    assert response.status_code == 429
+    assert elapsed < 1
+    assert manager.rate_limiter.blocked_until == 0.0
+
+
+def test_post_is_not_replayed_after_a_5xx():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await send_request("POST", "https://api.twitch.tv/helix/x", {}, client=client,
+                                      retry_policy=RetryPolicy(base_delay=0.001))
+
+    assert asyncio.run(run()).status_code == 503
+    assert len(calls) == 1
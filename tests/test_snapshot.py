@@ -0,0 +1,40 @@
+import asyncio
+
+from twitchconduits import read_snapshot
+
+
+def test_start_restores_from_snapshot(helix, make_conduits, tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start(snapshot_path=path)
+            conduit = await manager.create_conduit(0)
+            await conduit.create_shards(["a", "b"])
+            await conduit.create_subscription("stream.online", {"broadcaster_user_id": "1"})
+            await manager.save_snapshot(path)
+            expected = (conduit.id, sorted(conduit.shards_dict),
+                        {s.id: s.conduit_id for s in manager.subscriptions.by_id.values()})
+        async with make_conduits() as restored:
+            await restored.start(snapshot_path=path)
+            assert "load_snapshot" in restored.startup_timings
+            assert restored.revalidation_task is not None
+            [conduit] = restored.conduits
+            actual = (conduit.id, sorted(conduit.shards_dict),
+                      {s.id: s.conduit_id for s in restored.subscriptions.by_id.values()})
+            found = restored.find_shard(sorted(conduit.shards_dict)[0])
+            await restored.revalidation_task
+            return expected, actual, found, conduit
+
+    expected, actual, found, conduit = asyncio.run(run())
+    assert actual == expected
+    assert found[0] is conduit
+    assert read_snapshot(path) is not None
+    assert read_snapshot(path, max_age=-1) is None
+
+
+def test_unusable_snapshots_are_ignored(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing.db")) is None
+    corrupt = tmp_path / "corrupt.db"
+    corrupt.write_bytes(b"not a database")
+    assert read_snapshot(str(corrupt)) is None
@@ -0,0 +1,83 @@
+import asyncio
+
+from twitchconduits import CostTracker, QuotaExceeded
+
+
+def follow(user_id, moderator_id=None):
+    return "channel.follow", {"broadcaster_user_id": user_id, "moderator_user_id": moderator_id or user_id}
+
+
+def test_clean_up_removes_non_enabled(helix, make_conduits):
+    helix.add_subscriptions(150, status="authorization_revoked")
+    helix.add_subscriptions(20, start=1000)
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            return await manager.clean_up_subscriptions(concurrency=10)
+
+    report = asyncio.run(run())
+    assert len(report.deleted_ids) == 150
+    assert not report.failed_ids
+    assert {s["status"] for s in helix.subscriptions.values()} == {"enabled"}
+
+
+def test_reconcile_creates_and_deletes_only_desired_broadcasters(helix, make_conduits):
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            conduit = await manager.create_conduit()
+            await conduit.create_subscription(*follow("Y", "X"))
+            await conduit.create_subscription("stream.offline", {"broadcaster_user_id": "X"})
+            desired = {"X": [("stream.online", {"broadcaster_user_id": "X"})]}
+            plans = [await manager.plan_reconcile(desired, full_scan=full_scan) for full_scan in (False, True)]
+            applied = await manager.reconcile(conduit, desired)
+            again = await manager.plan_reconcile(desired)
+            return plans, applied, again
+
+    plans, applied, again = asyncio.run(run())
+    for plan in plans:
+        assert plan.to_create == [("stream.online", {"broadcaster_user_id": "X"})]
+        assert len(plan.to_delete) == 1
+    assert len(applied.created) == 1 and len(applied.deleted) == 1
+    assert not again.to_create and not again.to_delete and again.unchanged == 1
+    assert {s["type"] for s in helix.subscriptions.values()} == {"channel.follow", "stream.online"}
+
+
+def test_cost_admission_rejects_locally(helix, make_conduits):
+    helix.max_total_cost = 50
+    helix.add_subscriptions(20, cost=1)
+
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            conduit = await manager.create_conduit()
+            assert manager.costs.headroom == 30
+            items = [follow(str(i)) for i in range(100, 200)]
+            assert manager.predict_cost(items) == 100
+            results = [r async for r in conduit.bulk_create_subscriptions(items, concurrency=20)]
+            return manager, results
+
+    manager, results = asyncio.run(run())
+    assert sum(r.success for r in results) == 30
+    assert all("exceeds the remaining budget" in r.error for r in results if not r.success)
+    assert manager.costs.headroom == 0
+    assert manager.costs.rejected == 70
+    assert manager.metrics.cost_headroom == 0
+    assert not any(status == "429" for _, _, status in manager.metrics.statuses)
+
+
+def test_deferred_admission_waits_for_headroom():
+    async def run():
+        costs = CostTracker(defer=1.0)
+        costs.update({"total": 10, "total_cost": 10, "max_total_cost": 10})
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, costs.deleted, 1)
+        await costs.acquire(1)
+        assert costs.pending == 1
+        try:
+            await costs.acquire(1, defer=0)
+        except QuotaExceeded as e:
+            return e
+
+    assert asyncio.run(run()).headroom == 0
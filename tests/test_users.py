@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from twitchconduits import Users
+
+
+def user(user_id, expiry):
+    return {"user_id": user_id, "access_token": f"access{user_id}", "refresh_token": f"refresh{user_id}",
+            "login": f"user{user_id}", "expiry": expiry, "scopes": [], "code": None}
+
+
+def test_spilled_users_round_trip(tmp_path):
+    async def run():
+        users = Users(max_resident=10, spill_path=str(tmp_path / "users.db"), spill_batch=5)
+        for i in range(100):
+            users.add_user(user(str(i), time.time() + 3600))
+        await users.flush()
+        assert len(users.users) == 10 and not users._spill_writes
+        users.remove_user("3")
+        found = {i: users.get_user_by_id(str(i)) for i in range(100)}
+        by_token = users.get_user("access50")
+        await users.aclose()
+        return found, by_token
+
+    found, by_token = asyncio.run(run())
+    assert found.pop(3) is None
+    assert all(u is not None and u.refresh_token == f"refresh{i}" for i, u in found.items())
+    assert by_token.id == "50"
+
+
+def test_refresh_keeps_rotated_tokens_when_users_spill(helix, tmp_path):
+    # Refreshes overlap, so loading one user evicts others while their requests are in flight
+    helix.latency = 0.01
+
+    async def run():
+        users = Users("client", "secret", client=helix.client(), max_resident=2,
+                      spill_path=str(tmp_path / "users.db"), spill_batch=1)
+        for i in range(10):
+            users.add_user(user(str(i), time.time() - 1))
+        refreshed = await users.refresh_due(concurrency=10)
+        loaded = {}
+        for i in range(10):
+            u = users.get_user_by_id(str(i))
+            loaded[i] = u.refresh_token, users.get_user_by_refresh_token(u.refresh_token).id
+        await users.aclose()
+        return refreshed, loaded
+
+    refreshed, loaded = asyncio.run(run())
+    assert len(refreshed) == 10
+    for i, (refresh_token, indexed_id) in loaded.items():
+        assert refresh_token != f"refresh{i}"
+        assert indexed_id == str(i)
@@ -0,0 +1,69 @@
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timedelta, timezone
+
+from twitchconduits import MessageDeduplicator, WebhookReceiver
+from twitchconduits.jsonutil import dumps
+
+
+def timestamp(age: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=age)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def delivery(secret, message_type, payload, message_id="message-1", sent_at=None, signature=None):
+    body = dumps(payload)
+    sent_at = sent_at or timestamp()
+    if signature is None:
+        digest = hmac.new(secret.encode(), message_id.encode() + sent_at.encode() + body, hashlib.sha256)
+        signature = "sha256=" + digest.hexdigest()
+    headers = {
+        "twitch-eventsub-message-id": message_id,
+        "twitch-eventsub-message-timestamp": sent_at,
+        "twitch-eventsub-message-signature": signature,
+        "twitch-eventsub-message-type": message_type
+    }
+    return headers, body
+
+
+def receive(make_conduits, deliveries):
+    """Send (headers, body) deliveries to a receiver for one webhook shard; return the responses and queued events"""
+    async def run():
+        async with make_conduits() as manager:
+            await manager.start()
+            conduit = await manager.create_conduit(0)
+            shards, _ = await conduit.create_shards(["key"])
+            secret = shards[0].transport.secret
+            receiver = WebhookReceiver(manager, None, deduplicator=MessageDeduplicator())
+            responses = [await receiver.handle(secret, *make(secret)) for make in deliveries]
+            return responses, receiver.events.queue.qsize()
+    return asyncio.run(run())
+
+
+NOTIFICATION = {"subscription": {"id": "sub", "type": "stream.online"}, "event": {"broadcaster_user_id": "1"}}
+
+
+def test_non_ascii_signature_is_rejected(make_conduits):
+    responses, queued = receive(make_conduits, [
+        lambda secret: delivery(secret, "notification", NOTIFICATION, signature="sha256=é"),
+        lambda secret: delivery(secret, "notification", NOTIFICATION, signature="sha256=0000"),
+    ])
+    assert [status for status, _, _ in responses] == [403, 403]
+    assert queued == 0
+
+
+def test_challenge_is_answered(make_conduits):
+    responses, _ = receive(make_conduits, [
+        lambda secret: delivery(secret, "webhook_callback_verification", {"challenge": "pong"})
+    ])
+    assert responses == [(200, "text/plain", b"pong")]
+
+
+def test_duplicates_are_acknowledged_once_and_stale_messages_rejected(make_conduits):
+    responses, queued = receive(make_conduits, [
+        lambda secret: delivery(secret, "notification", NOTIFICATION, message_id="a"),
+        lambda secret: delivery(secret, "notification", NOTIFICATION, message_id="a"),
+        lambda secret: delivery(secret, "notification", NOTIFICATION, message_id="b", sent_at=timestamp(3600)),
+    ])
+    assert [status for status, _, _ in responses] == [204, 204, 403]
+    assert queued == 1
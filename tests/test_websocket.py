@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+import pytest
+
+pytest.importorskip("websockets")
+
+from twitchconduits import EventQueue, Shard, WebSocketShard  # noqa: E402
+
+
+class FakeSession:
+    """A WebSocketSession that delivers queued messages, then waits"""
+    count = 0
+
+    def __init__(self, messages=()):
+        FakeSession.count += 1
+        self.session_id = f"session{FakeSession.count}"
+        self.messages = list(messages)
+        self.closed = False
+
+    async def receive(self, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def close(self):
+        self.closed = True
+
+
+class FlakyConduit:
+    """update_shards fails with a Helix 500 for the first `failures` calls"""
+    conduits = None
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.assigned = []
+
+    async def update_shards(self, shards):
+        if self.failures:
+            self.failures -= 1
+            request = httpx.Request("PATCH", "https://api.twitch.tv/helix/eventsub/conduits/shards")
+            raise httpx.HTTPStatusError("500", request=request, response=httpx.Response(500, request=request))
+        self.assigned.append(shards[0]["transport"]["session_id"])
+        return {"data": [], "errors": []}
+
+
+class ScriptedShard(WebSocketShard):
+    def __init__(self, conduit, sessions):
+        super().__init__(conduit, Shard("0", "token", "https://example.com/"), EventQueue(None), failover_delay=0)
+        self.sessions = sessions
+        self.opened = []
+
+    async def _open(self, url):
+        session = self.sessions.pop(0)
+        self.opened.append(session)
+        return session
+
+
+def serve(runner):
+    async def run():
+        task = asyncio.ensure_future(runner.run())
+        await asyncio.sleep(0.05)
+        alive = not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return alive
+    return asyncio.run(run())
+
+
+def test_failover_survives_helix_errors_and_closes_unassigned_sessions():
+    conduit = FlakyConduit(failures=2)
+    runner = ScriptedShard(conduit, [FakeSession() for _ in range(3)])
+    assert serve(runner)
+    assert [session.closed for session in runner.opened[:2]] == [True, True]
+    assert conduit.assigned == [runner.opened[2].session_id]
+    assert runner.shard.session_id == runner.opened[2].session_id
+
+
+def test_reconnect_that_cannot_be_assigned_fails_over():
+    reconnect = {"metadata": {"message_type": "session_reconnect"},
+                 "payload": {"session": {"reconnect_url": "wss://example.com/reconnect"}}}
+    conduit = FlakyConduit(failures=0)
+    first, reconnected, fresh = FakeSession([reconnect]), FakeSession(), FakeSession()
+    runner = ScriptedShard(conduit, [first, reconnected, fresh])
+    original_update = conduit.update_shards
+
+    async def update_shards(shards):
+        if shards[0]["transport"]["session_id"] == reconnected.session_id:
+            conduit.failures = 1
+        return await original_update(shards)
+
+    conduit.update_shards = update_shards
+    assert serve(runner)
+    assert first.closed and reconnected.closed
+    assert conduit.assigned == [first.session_id, fresh.session_id]
+    assert runner.session is fresh
@@ -1,49 +1,390 @@
 import asyncio
+from collections import OrderedDict
 from typing import List, Dict
 import hashlib
+import heapq
+import logging
 import secrets
+import sys
+import time
 import httpx
-from .sub_versions import sub_dict
+from .sub_versions import sub_dict, non_enabled_statuses, registry, SubscriptionSpec, compile_subscription
+from .ratelimit import RateLimiter, bucket_empty
+from .retry import RetryPolicy
+from .snapshot import read_snapshot, write_snapshot, SQLiteStore
+from .dedup import MessageDeduplicator, DedupBackend, MemoryDedupBackend, parse_timestamp
+from .events import EventSubEvent, EventQueue
+from .webhook import WebhookReceiver, verify_signature
+from .websocket import WebSocketConsumer, WebSocketShard, WebSocketSession
+from .dispatch import ProcessDispatcher
+from .health import ShardHealthMonitor
+from .autoscale import ShardAutoscaler
+from .auth import AppTokenManager
+from .jsonutil import loads, dumps, ORJSON_AVAILABLE
+from .metrics import RequestHooks, RequestMetrics, OpenTelemetryHooks, endpoint
+from .fakehelix import FakeHelix
+from .placement import ConduitPlacement, HashRing, RebalancePlan, placement_key
+from .quota import CostTracker, QuotaExceeded
 
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_client(max_connections: int = 100, max_keepalive_connections: int = 20,
+                  keepalive_expiry: float = 30.0, http2: bool = None, timeout: float = 10.0) -> httpx.AsyncClient:
+    """Create a connection-pooled AsyncClient suitable for sharing across requests."""
+    if http2 is None:
+        http2 = HTTP2_AVAILABLE
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+
+async def send_request(method: str, url: str, headers: Dict, json: Dict = None, params: Dict = None, retries: int = 3,
+                       client: httpx.AsyncClient = None, limiter: RateLimiter = None,
+                       retry_policy: RetryPolicy = None, metrics: RequestHooks = None) -> Dict:
+    """Send an HTTP request with retry logic.
+
+    If a client is given it is reused (and left open), otherwise a one-off client is created.
+    If a limiter is given, requests are paced by it and 429 responses with an empty bucket are
+    retried at the reset time; other 429s (cost or duplicate limits) are returned as they are.
+    Retries follow retry_policy, or a default RetryPolicy with `retries` attempts.
+    Every attempt, retry and rate limit update is reported to `metrics` (see RequestHooks).
+    """
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await send_request(method, url, headers, json=json, params=params, retries=retries,
+                                      client=client, limiter=limiter, retry_policy=retry_policy, metrics=metrics)
+
+    policy = retry_policy or RetryPolicy(max_attempts=retries)
+    # Encode the body once, not on every attempt
+    content = None
+    if json is not None:
+        content = dumps(json)
+        if "Content-Type" not in headers:
+            headers = {**headers, "Content-Type": "application/json"}
+    path = endpoint(url) if metrics is not None else None
+    started = time.monotonic()
+    attempt = 0
+    rate_limited = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            await limiter.acquire()
+        if metrics is not None:
+            metrics.request_started(method, path)
+        sent = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, content=content, params=params)
+        except httpx.HTTPError as e:
+            if metrics is not None:
+                metrics.request_finished(method, path, type(e).__name__, time.perf_counter() - sent)
+            delay = policy.next_delay(method, attempt, started, exception=e)
+            if delay is None:
+                raise
+            if metrics is not None:
+                metrics.request_retried(method, path, type(e).__name__)
+            logger.warning("%s on %s %s, retrying (attempt %d/%d)", type(e).__name__, method, url, attempt,
+                           policy.max_attempts)
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            if metrics is not None:
+                metrics.request_finished(method, path, "cancelled", time.perf_counter() - sent)
+            raise
+
+        if metrics is not None:
+            metrics.request_finished(method, path, response.status_code, time.perf_counter() - sent)
+            remaining = response.headers.get("Ratelimit-Remaining")
+            if remaining is not None:
+                limit = response.headers.get("Ratelimit-Limit")
+                metrics.rate_limit_updated(int(remaining), int(limit) if limit is not None else None)
+        if limiter is not None:
+            limiter.update(response.headers)
+        if response.status_code in {200, 202, 204}:
+            return response
+        throttled = response.status_code == 429 and bucket_empty(response.headers)
+        if throttled:
+            # Rate limited attempts do not use up the retry budget
+            attempt -= 1
+            rate_limited += 1
+        delay = policy.next_delay(method, attempt, started, response=response, rate_limited=rate_limited)
+        if delay is None:
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("%s %s failed: %d - %s", method, url, response.status_code, response.text)
+            return response
+        if metrics is not None:
+            metrics.request_retried(method, path, response.status_code)
+        if throttled:
+            logger.warning("%s %s rate limited, retrying at reset (%d/%d)", method, url, rate_limited,
+                           policy.max_rate_limit_retries)
+        else:
+            logger.warning("%s %s failed: %d, retrying (attempt %d/%d)", method, url, response.status_code, attempt,
+                           policy.max_attempts)
+        if throttled and limiter is not None:
+            limiter.block(response.headers)
+        else:
+            await asyncio.sleep(delay)
+
+
+async def _aiter(items):
+    """Iterate over a sync or async iterable asynchronously."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def _bounded_as_completed(items, func, concurrency: int):
+    """Run func(item) for each item with at most `concurrency` in flight, yielding results as they complete."""
+    pending = set()
+    try:
+        async for item in _aiter(items):
+            pending.add(asyncio.ensure_future(func(item)))
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class SubscriptionResult:
+    """Outcome of a single subscription request in a bulk job"""
+    def __init__(self, subscription_type, condition):
+        self.type = subscription_type
+        self.condition = condition
+        self.success = False
+        self.skipped = False
+        self.status_code = None
+        self.error = None
+        self.cost = None
+        self.data = None
+
+    def to_dict(self):
+        """Convert SubscriptionResult to dict"""
+        return {
+            "type": self.type,
+            "condition": self.condition,
+            "success": self.success,
+            "skipped": self.skipped,
+            "status_code": self.status_code,
+            "error": self.error,
+            "cost": self.cost,
+            "data": self.data
+        }
+
+
+class CleanupReport:
+    """Summary of a Conduits.clean_up_subscriptions run"""
+    def __init__(self):
+        self.found = {}
+        self.deleted_ids = []
+        self.already_deleted = 0
+        self.failed_ids = []
+        self.errors = {}
+        self.timings = {}
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        """Convert CleanupReport to dict"""
+        return {
+            "found": self.found,
+            "deleted": len(self.deleted_ids),
+            "already_deleted": self.already_deleted,
+            "failed": len(self.failed_ids),
+            "failed_ids": self.failed_ids,
+            "errors": self.errors,
+            "timings": self.timings,
+            "elapsed": self.elapsed
+        }
+
+
+class ReconcilePlan:
+    """Create/delete operations computed by Conduits.reconcile, and their outcome once applied"""
+    def __init__(self):
+        self.to_create = []
+        self.to_delete = []
+        self.invalid = []
+        self.unchanged = 0
+        self.created = []
+        self.deleted = []
+        self.failed = []
+        self.applied = False
+
+    def to_dict(self):
+        """Convert ReconcilePlan to dict"""
+        return {
+            "to_create": self.to_create,
+            "to_delete": self.to_delete,
+            "invalid": self.invalid,
+            "unchanged": self.unchanged,
+            "created": self.created,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "applied": self.applied
+        }
 
-async def send_request(method: str, url: str, headers: Dict, json: Dict = None, params: Dict = None, retries: int = 3) -> Dict:
-    """Send an HTTP request with retry logic."""
-    async with httpx.AsyncClient() as client:
-        for attempt in range(retries):
-            try:
-                response = await client.request(method, url, headers=headers, json=json, params=params)
-                if response.status_code in {200, 202, 204}:
-                    return response
-                else:
-                    print(f"Request failed: {response.status_code} - {response.text}")
-                    return response
-            except httpx.ConnectTimeout:
-                if attempt < retries - 1:
-                    print(f"Connection timed out. Retrying... (Attempt {attempt + 1}/{retries})")
-                    await asyncio.sleep(1)
-                else:
-                    raise
-    return response
+
+def condition_key(subscription_type, condition) -> tuple:
+    """Hashable key for a subscription type and condition, ignoring empty condition values."""
+    return subscription_type, tuple(sorted((k, v) for k, v in condition.items() if v))
 
 
 class Subscription:
     """Subscription Class"""
-    def __init__(self, sub_id, user_id):
+    __slots__ = ("id", "user_id", "type", "version", "condition", "status", "cost", "created_at", "conduit_id")
+
+    def __init__(self, sub_id, user_id, subscription_type=None, version=None, condition=None, status=None,
+                 cost=None, created_at=None, conduit_id=None):
         self.id = sub_id
         self.user_id = user_id
-        self.status = None
+        self.type = subscription_type
+        self.version = version
+        self.condition = condition or {}
+        self.status = status
+        self.cost = cost
+        self.created_at = created_at
+        self.conduit_id = conduit_id
+
+    @classmethod
+    def from_api(cls, data: dict):
+        """Build a Subscription from a Helix subscription object."""
+        condition = data.get("condition", {})
+        user_id = (condition.get("broadcaster_user_id") or condition.get("user_id")
+                   or condition.get("to_broadcaster_user_id"))
+        # The parsed condition dict is kept as is; the few distinct type/version/status strings are interned
+        # so that large subscription sets share them
+        subscription_type = data.get("type")
+        version = data.get("version")
+        status = data.get("status")
+        return cls(
+            sub_id=data["id"],
+            user_id=user_id,
+            subscription_type=sys.intern(subscription_type) if subscription_type else subscription_type,
+            version=sys.intern(version) if version else version,
+            condition=condition,
+            status=sys.intern(status) if status else status,
+            cost=data.get("cost"),
+            created_at=data.get("created_at"),
+            conduit_id=(data.get("transport") or {}).get("conduit_id")
+        )
+
+    @property
+    def user_ids(self):
+        """All user IDs referenced by the condition."""
+        return {v for k, v in self.condition.items() if v and k.endswith("user_id")}
 
     def to_dict(self):
         """Convert Subscription to dict"""
         return {
             "id": self.id,
             "user_id": self.user_id,
-            "status": self.status
+            "type": self.type,
+            "version": self.version,
+            "condition": self.condition,
+            "status": self.status,
+            "cost": self.cost,
+            "created_at": self.created_at,
+            "conduit_id": self.conduit_id
         }
 
 
+class SubscriptionIndex:
+    """In-memory subscription records with O(1) lookups by ID, by (type, condition) and by user ID.
+
+    Iterating or testing membership works on subscription IDs, like the plain set it replaces.
+    """
+    def __init__(self, subscriptions=()):
+        self.by_id: Dict[str, Subscription] = {}
+        self.by_key: Dict[tuple, Subscription] = {}
+        self.by_user: Dict[str, set] = {}
+        for subscription in subscriptions:
+            self.add(subscription)
+
+    def add(self, subscription: Subscription) -> Subscription:
+        """Add or replace a subscription record."""
+        self.discard(subscription.id)
+        self.by_id[subscription.id] = subscription
+        self.by_key[condition_key(subscription.type, subscription.condition)] = subscription
+        for user_id in subscription.user_ids:
+            self.by_user.setdefault(user_id, set()).add(subscription.id)
+        return subscription
+
+    def add_from_api(self, data: dict) -> Subscription:
+        """Add a record from a Helix subscription object."""
+        return self.add(Subscription.from_api(data))
+
+    def discard(self, sub_id):
+        """Remove a subscription record if present."""
+        subscription = self.by_id.pop(sub_id, None)
+        if subscription is None:
+            return None
+        key = condition_key(subscription.type, subscription.condition)
+        if self.by_key.get(key) is subscription:
+            del self.by_key[key]
+        for user_id in subscription.user_ids:
+            ids = self.by_user.get(user_id)
+            if ids is not None:
+                ids.discard(sub_id)
+                if not ids:
+                    del self.by_user[user_id]
+        return subscription
+
+    def get(self, sub_id):
+        """Get a subscription by ID."""
+        return self.by_id.get(sub_id)
+
+    def find(self, subscription_type, condition):
+        """Get the subscription for a type and condition, if one is known."""
+        return self.by_key.get(condition_key(subscription_type, condition))
+
+    def for_user(self, user_id):
+        """Get all subscriptions whose condition references a user ID."""
+        return [self.by_id[sub_id] for sub_id in self.by_user.get(user_id, ())]
+
+    def clear(self):
+        """Remove all records."""
+        self.by_id.clear()
+        self.by_key.clear()
+        self.by_user.clear()
+
+    def __contains__(self, sub_id):
+        return sub_id in self.by_id
+
+    def __iter__(self):
+        return iter(self.by_id)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+def _epoch(expiry) -> float:
+    """Convert a user token expiry (epoch seconds or RFC 3339 string) to epoch seconds."""
+    if isinstance(expiry, str):
+        return parse_timestamp(expiry)
+    return float(expiry or 0)
+
+
 class User:
     """User class"""
+    __slots__ = ("id", "access_token", "refresh_token", "login", "expiry", "scopes", "code")
+
     def __init__(self, user_dict):
         self.id = user_dict["user_id"]
         self.access_token = user_dict["access_token"]
@@ -52,50 +393,336 @@ class User:
         self.expiry = user_dict["expiry"]
         self.scopes = user_dict["scopes"]
         self.code = user_dict["code"]
-        self.queue = asyncio.Queue()  # Queue for managing outgoing messages
+
+    def to_dict(self):
+        """Convert User to the dict it was built from"""
+        return {
+            "user_id": self.id,
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "login": self.login,
+            "expiry": self.expiry,
+            "scopes": self.scopes,
+            "code": self.code
+        }
 
 
 class Users:
-    """Users class"""
-    def __init__(self):
-        self.users = {}
+    """Users class
+
+    Keeps users indexed by ID, access token and refresh token, and schedules user token
+    refreshes in expiry order with a heap. With max_resident and spill_path, the least
+    recently used users beyond max_resident are moved to an SQLite file and loaded back on
+    access; the indexes and schedule stay in memory. Spilled users are written in batches of
+    spill_batch from an executor, and refreshes load spilled users there too, so the event loop
+    does not wait on disk writes. Pass client_id and client_secret to refresh tokens with
+    refresh_due() or the background loop started by start(); refreshes share one pooled client.
+    """
+    def __init__(self, client_id=None, client_secret=None, client: httpx.AsyncClient = None,
+                 refresh_margin: float = 300.0, retry_delay: float = 60.0, max_resident: int = None,
+                 spill_path: str = None, spill_batch: int = 500):
+        self.users = OrderedDict()
         self.refresh_tokens = {}
         self.keys = {}
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._owns_client = client is None
+        self.client = client or create_client()
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.max_resident = max_resident
+        self.spill = SQLiteStore(spill_path) if spill_path else None
+        self.spill_batch = spill_batch
+        # Spilled users not yet written, and removed users whose rows are still on disk
+        self._spill_writes = {}
+        self._spill_deletes = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        # Users with a refresh in flight; they are not spilled until it finishes
+        self._refreshing = set()
+        self.refresh_failures = {}
+        self._due = {}
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def _index(self, user: User):
+        self.keys[user.access_token] = user.id
+        self.refresh_tokens[user.refresh_token] = user.id
+        self._schedule(user.id, _epoch(user.expiry) - self.refresh_margin)
+
+    def _unindex(self, user: User):
+        if self.keys.get(user.access_token) == user.id:
+            del self.keys[user.access_token]
+        if self.refresh_tokens.get(user.refresh_token) == user.id:
+            del self.refresh_tokens[user.refresh_token]
+
+    def _schedule(self, user_id, due_at: float):
+        self._due[user_id] = due_at
+        heapq.heappush(self._heap, (due_at, user_id))
+        if self._heap[0][1] == user_id:
+            self._wakeup.set()
+
+    def _make_resident(self, user: User):
+        self.users[user.id] = user
+        self.users.move_to_end(user.id)
+        self._evict(keep=user.id)
+
+    def _evict(self, keep=None):
+        """Spill the least recently used users beyond max_resident, except `keep` and ones being refreshed."""
+        if self.spill is None or self.max_resident is None:
+            return
+        while len(self.users) > self.max_resident:
+            user_id = next((user_id for user_id in self.users
+                            if user_id != keep and user_id not in self._refreshing), None)
+            if user_id is None:
+                break
+            self._spill_writes[user_id] = self.users.pop(user_id).to_dict()
+            self._spill_deletes.discard(user_id)
+        if len(self._spill_writes) >= self.spill_batch:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            # No event loop, so nothing to block: write directly
+            self._write_spill(*self._take_spill())
+            self._spill_writes.clear()
+            return
+        self._flush_task.add_done_callback(self._on_flushed)
+
+    def _on_flushed(self, task):
+        """Report a failed background spill write"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Writing spilled users failed: %r", task.exception())
+
+    def _take_spill(self):
+        writes = dict(self._spill_writes)
+        deletes = self._spill_deletes
+        self._spill_deletes = set()
+        return writes, deletes
+
+    def _write_spill(self, writes, deletes):
+        if deletes:
+            self.spill.delete_many(deletes)
+        if writes:
+            self.spill.put_many(writes.items())
+
+    async def flush(self):
+        """Write pending spilled users and removals to the spill file in one batch, off the event loop."""
+        if self.spill is None:
+            return
+        async with self._flush_lock:
+            writes, deletes = self._take_spill()
+            if not writes and not deletes:
+                return
+            await asyncio.get_running_loop().run_in_executor(None, self._write_spill, writes, deletes)
+            # Keep entries that were spilled again while writing; loaded-back ones are already gone
+            for user_id, data in writes.items():
+                if self._spill_writes.get(user_id) is data:
+                    del self._spill_writes[user_id]
+
+    async def _load(self, user_id):
+        """Make a spilled user resident, reading the spill file in an executor."""
+        if self.spill is None or user_id in self.users or user_id in self._spill_writes or user_id not in self._due:
+            return
+        # Under the flush lock a newer copy cannot be written to disk while the old one is read
+        async with self._flush_lock:
+            data = await asyncio.get_running_loop().run_in_executor(None, self.spill.get, user_id)
+        if data is not None and user_id not in self.users and user_id not in self._spill_writes and user_id in self._due:
+            self._make_resident(User(data))
 
     def add_user(self, user_dict):
         """Add a user to the users collection."""
         new_user = User(user_dict)
-        self.users[new_user.id] = new_user
-        self.keys[new_user.access_token] = new_user.id
-        self.refresh_tokens[new_user.refresh_token] = new_user.id
-        return self.users[new_user.id]
-    
+        old_user = self.get_user_by_id(new_user.id)
+        if old_user is not None:
+            self._unindex(old_user)
+        self._index(new_user)
+        self._make_resident(new_user)
+        return new_user
+
+    def get_user_by_id(self, user_id):
+        """Get a user by ID, loading it back from the spill file if needed."""
+        user = self.users.get(user_id)
+        if user is not None:
+            self.users.move_to_end(user_id)
+            return user
+        if self.spill is not None and user_id in self._due:
+            data = self._spill_writes.pop(user_id, None)
+            if data is None:
+                # Rows on disk may go stale once the user is resident; the next spill overwrites them
+                data = self.spill.get(user_id)
+            if data is not None:
+                user = User(data)
+                self._make_resident(user)
+                return user
+        return None
+
     def get_user(self, key):
         """Get a user by key."""
         user_id = self.keys.get(key)
         if user_id:
-            return self.users.get(user_id)
+            return self.get_user_by_id(user_id)
         return None  # Return None explicitly if user is not found
 
+    def get_user_by_refresh_token(self, refresh_token):
+        """Get a user by refresh token."""
+        user_id = self.refresh_tokens.get(refresh_token)
+        if user_id:
+            return self.get_user_by_id(user_id)
+        return None
+
     def remove_user(self, user_id):
         """Remove a user from the users collection."""
-        user = self.users.pop(user_id, None)
+        user = self.get_user_by_id(user_id)
         if user:
-            self.keys.pop(user.key, None)
+            self.users.pop(user_id, None)
+            self._unindex(user)
+            self._due.pop(user_id, None)
+            self.refresh_failures.pop(user_id, None)
+            if self.spill is not None:
+                self._spill_deletes.add(user_id)
             # No WebSocket close operation here, it's handled elsewhere
+        return user
 
+    def __len__(self):
+        return len(self._due)
+
+    def due_users(self, now: float = None):
+        """Pop the IDs of users whose tokens are due for refresh, in expiry order."""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, user_id = heapq.heappop(self._heap)
+            # Entries are replaced rather than updated in place, so skip stale ones
+            if self._due.get(user_id) == due_at:
+                due.append(user_id)
+        return due
+
+    async def refresh_user(self, user_id) -> bool:
+        """Refresh one user's token with the OAuth refresh_token grant.
+
+        The user stays resident until the refresh finishes, so the new tokens are not lost to a spill.
+        """
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return False
+        self._refreshing.add(user_id)
+        try:
+            return await self._refresh(user)
+        finally:
+            self._refreshing.discard(user_id)
+            self._evict()
+
+    async def _refresh(self, user: User) -> bool:
+        user_id = user.id
+        url = "https://id.twitch.tv/oauth2/token"
+        params = {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": user.refresh_token
+        }
+        try:
+            response = await send_request("POST", url, {}, params=params, client=self.client)
+        except httpx.HTTPError as e:
+            self.refresh_failures[user_id] = repr(e)
+            self._schedule(user_id, time.time() + self.retry_delay)
+            return False
+        if response.status_code != 200:
+            self.refresh_failures[user_id] = response.text
+            if response.status_code >= 500 or response.status_code == 429:
+                self._schedule(user_id, time.time() + self.retry_delay)
+            return False
+        data = loads(response.content)
+        self._unindex(user)
+        user.access_token = data["access_token"]
+        user.refresh_token = data.get("refresh_token", user.refresh_token)
+        user.scopes = data.get("scope", user.scopes)
+        user.expiry = time.time() + data.get("expires_in", 0)
+        self._index(user)
+        self.refresh_failures.pop(user_id, None)
+        return True
+
+    async def refresh_due(self, concurrency: int = 10):
+        """Refresh every user whose token is due, at most `concurrency` at a time. Returns the refreshed IDs."""
+        refreshed = []
+
+        async def refresh(user_id):
+            await self._load(user_id)
+            return user_id, await self.refresh_user(user_id)
+
+        async for user_id, success in _bounded_as_completed(self.due_users(), refresh, concurrency):
+            if success:
+                refreshed.append(user_id)
+        await self.flush()
+        return refreshed
+
+    def start(self, concurrency: int = 10):
+        """Refresh user tokens in the background as they come due."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run(concurrency))
+
+    async def stop(self):
+        """Stop background refreshing."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def aclose(self):
+        """Stop refreshing, write pending spilled users, and close the spill file and owned HTTP client."""
+        await self.stop()
+        if self.spill is not None:
+            await self.flush()
+            self.spill.close()
+        if self._owns_client and not self.client.is_closed:
+            await self.client.aclose()
+
+    async def _run(self, concurrency: int):
+        while True:
+            await self.refresh_due(concurrency)
+            delay = self._heap[0][0] - time.time() if self._heap else 3600
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, min(delay, 3600)))
+            except asyncio.TimeoutError:
+                pass
 
 
 class Transport:
     """Transport class"""
-    def __init__(self, callback_url, key="", secret=None):
-        self.method = "webhook"
+    __slots__ = ("method", "key", "session_id", "secret", "callback")
+
+    def __init__(self, callback_url, key="", secret=None, method="webhook", session_id=None):
+        self.method = method
         self.key = key
-        self.secret = secret or hashlib.sha256(f"{secrets.token_bytes(32).hex()}:{key}".encode()).hexdigest()
-        self.callback = f"{callback_url}{self.secret}"
+        self.session_id = session_id
+        if method == "websocket":
+            self.secret = None
+            self.callback = None
+        else:
+            self.secret = secret or hashlib.sha256(f"{secrets.token_bytes(32).hex()}:{key}".encode()).hexdigest()
+            self.callback = f"{callback_url}{self.secret}"
+
+    @classmethod
+    def from_api(cls, callback_url, data: dict):
+        """Build a Transport from a Helix shard transport object."""
+        if data.get("method") == "websocket":
+            return cls(callback_url, method="websocket", session_id=data.get("session_id"))
+        return cls(callback_url=callback_url, secret=data["callback"].rsplit('/', 1)[-1])
 
     def to_dict(self):
         """Return a dictionary"""
+        if self.method == "websocket":
+            return {
+                "method": self.method,
+                "session_id": self.session_id
+            }
         return {
             "method": self.method,
             "callback": self.callback,
@@ -105,6 +732,8 @@ class Transport:
 
 class Shard:
     """Shard Class"""
+    __slots__ = ("id", "key", "access_token", "transport", "session_id", "status")
+
     def __init__(self, shard_id, access_token, callback_url, key="", transport=None, session_id=None, status=None):
         self.id = shard_id
         self.key = key
@@ -123,6 +752,8 @@ class Shard:
             self.transport.method = transport_data.get("method", self.transport.method)
             self.transport.callback = transport_data.get("callback", self.transport.callback)
             self.transport.secret = transport_data.get("secret", self.transport.secret)
+            self.transport.session_id = transport_data.get("session_id", self.transport.session_id)
+            self.session_id = self.transport.session_id or self.session_id
 
     def to_dict(self):
         """Convert Shard object to a dictionary."""
@@ -136,16 +767,30 @@ class Shard:
 
 class Conduit:
     """Conduit Class"""
+    __slots__ = ("conduits", "id", "shard_count", "_access_token", "callback_url", "client_id", "shards", "shards_dict",
+                 "on_delete", "_subscription_transport")
+
     def __init__(self, conduits, conduit_id, shard_count, access_token, client_id, callback_url):
         self.conduits = conduits
         self.id = conduit_id
         self.shard_count = shard_count
-        self.access_token = access_token
+        self._access_token = access_token
         self.callback_url = callback_url
         self.client_id = client_id
         self.shards: List[Shard] = []
         self.shards_dict = {}
         self.on_delete = None
+        # Shared by every create-subscription payload of this Conduit; it is only ever serialized
+        self._subscription_transport = {"method": "conduit", "conduit_id": conduit_id}
+
+    @property
+    def access_token(self):
+        """The live app access token of the parent Conduits."""
+        return self.conduits.access_token or self._access_token
+
+    @access_token.setter
+    def access_token(self, value):
+        self._access_token = value
 
     def to_dict(self) -> Dict:
         """Convert Conduit object to a dictionary."""
@@ -166,15 +811,28 @@ class Conduit:
             "shard_count": shard_count
         }
         url = "https://api.twitch.tv/helix/eventsub/conduits"
-        response = await send_request("PATCH", url, headers, json=data)
+        response = await self.conduits._send_request("PATCH", url, headers, json=data)
         if response.status_code == 200:
-            print(f"Conduit {self.id} shard count updated to {shard_count}")
+            logger.info("Conduit %s shard count updated to %d", self.id, shard_count)
             self.shard_count = shard_count
             return self
 
+    async def remove_shards(self, shard_count):
+        """Shrink the Conduit to shard_count shards, dropping the highest-numbered ones locally too."""
+        if await self.update_conduit(shard_count) is None:
+            return None
+        self.shards = [shard for shard in self.shards if int(shard.id) < shard_count]
+        self.make_dict()
+        return self
+
+    def new_websocket_shard(self, shard_id) -> Shard:
+        """Create a local Shard that uses the WebSocket transport."""
+        transport = Transport(self.callback_url, method="websocket")
+        return Shard(shard_id, self.access_token, callback_url=self.callback_url, transport=transport)
+
     def make_dict(self):
         """Map the shards to a dictionary"""
-        self.shards_dict = {shard.transport.secret: shard for shard in self.shards}
+        self.shards_dict = {shard.transport.secret: shard for shard in self.shards if shard.transport.secret}
 
     async def delete_conduit(self):
         """Delete a Twitch EventSub conduit."""
@@ -183,15 +841,15 @@ class Conduit:
             "Authorization": f"Bearer {self.access_token}",
             "Client-Id": self.client_id
         }
-        response = await send_request("DELETE", url, headers)
+        response = await self.conduits._send_request("DELETE", url, headers)
         if response.status_code == 204:
-            print(f"Conduit {self.id} deleted successfully.")
+            logger.info("Conduit %s deleted", self.id)
             if self.on_delete:
                 self.on_delete(self)
             return True
 
-    async def get_shards(self, status=""):
-        """Retrieve the shard information for a Conduit"""
+    async def fetch_shards(self, status=""):
+        """Retrieve raw Helix shard objects, optionally filtered by status, without touching self.shards"""
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Client-Id": self.client_id
@@ -202,9 +860,9 @@ class Conduit:
 
         while True:
             params = {"conduit_id": self.id, "status": status, "after": after}
-            response = await send_request("GET", url, headers, params=params)
+            response = await self.conduits._send_request("GET", url, headers, params=params)
             if response.status_code == 200:
-                response = response.json()
+                response = loads(response.content)
                 shards_data.extend(response.get("data", []))
                 pagination = response.get("pagination", {})
                 after = pagination.get("cursor")
@@ -212,12 +870,16 @@ class Conduit:
                     break
             else:
                 response.raise_for_status()
+        return shards_data
 
+    async def get_shards(self, status=""):
+        """Retrieve the shard information for a Conduit"""
+        shards_data = await self.fetch_shards(status)
         self.shards = [
             Shard(
                 shard_id=s["id"],
                 access_token=self.access_token,
-                transport=Transport(callback_url=self.callback_url, secret=s["transport"]["callback"].rsplit('/', 1)[-1]),
+                transport=Transport.from_api(self.callback_url, s["transport"]),
                 status=s["status"],
                 callback_url=self.callback_url
             )
@@ -239,10 +901,10 @@ class Conduit:
 
         new_shard = Shard(len(self.shards), self.access_token, callback_url=self.callback_url, key=key)
         payload = {"conduit_id": self.id, "shards": [new_shard.to_dict()]}
-        response = await send_request("PATCH", url, headers, json=payload)
+        response = await self.conduits._send_request("PATCH", url, headers, json=payload)
         if response.status_code == 202:
-            response = response.json()
-            print(f"Shards created for conduit {self.id}")
+            response = loads(response.content)
+            logger.info("Shards created for conduit %s", self.id)
             new_shard.update_from_dict(response)
             self.shards.append(new_shard)
             self.shards_dict[new_shard.transport.secret] = new_shard
@@ -250,79 +912,287 @@ class Conduit:
         else:
             response.raise_for_status()
 
+    def find_subscription(self, subscription, condition):
+        """Return the locally indexed subscription for a type and condition, if any."""
+        spec = registry.get(subscription)
+        if spec is None:
+            return None
+        return self.conduits.subscriptions.find(subscription, spec.condition(condition))
+
+    async def create_subscription(self, subscription, condition, version=None):
+        """Create a single subscription on this Conduit and return the response.
+
+        The type, version and condition are checked against the registry first; invalid ones
+        raise ValueError without a request. QuotaExceeded is raised, also without a request,
+        when the subscription would not fit in the cost budget (see Conduits.costs).
+        """
+        spec, condition = compile_subscription(subscription, condition, version)
+        return await self._create_compiled(spec, condition, version)
+
+    async def _create_compiled(self, spec: SubscriptionSpec, condition, version=None):
+        """Send a create-subscription request for an already validated condition."""
+        url = "https://api.twitch.tv/helix/eventsub/subscriptions"
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Client-Id": self.client_id,
+            "Content-Type": "application/json"
+        }
+        data = spec.payload(condition, self._subscription_transport, version)
+        costs = self.conduits.costs
+        cost = costs.predict(condition, self.conduits.subscriptions)
+        await costs.acquire(cost)
+        try:
+            response = await self.conduits._send_request("POST", url, headers, json=data)
+        finally:
+            costs.release(cost)
+        if response.status_code == 202:
+            body = loads(response.content)
+            costs.update(body)
+            self.conduits.subscriptions.add_from_api(body["data"][0])
+        return response
+
     async def create_subscriptions(self, subscriptions, condition):
         """Create multiple subscriptions concurrently"""
         async def create_single_subscription(subscription):
             """Helper function to create a single subscription"""
-            if subscription in sub_dict:
-                url = "https://api.twitch.tv/helix/eventsub/subscriptions"
-                headers = {
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Client-Id": self.client_id,
-                    "Content-Type": "application/json"
-                }
-                data = {
-                    "type": subscription,
-                    "version": sub_dict[subscription]["version"],
-                    "condition": {k: d for k, d in condition.items() if k in sub_dict[subscription]["conditions"]},
-                    "transport": {"method": "conduit", "conduit_id": self.id}
-                }
-                response = await send_request("POST", url, headers, json=data)
-                if response.status_code == 202:
-                    # print(f"Subscription '{subscription}' created successfully!")
-                    r = response.json()
-                    self.conduits.subscriptions.add(r["data"][0]["id"])
-                    return r["data"]
+            try:
+                spec, sub_condition = compile_subscription(subscription, condition)
+            except ValueError as e:
+                logger.warning("Skipping subscription %r: %s", subscription, e)
+                return (False, subscription)
+            existing = self.conduits.subscriptions.find(subscription, sub_condition)
+            if existing is not None:
+                return [existing.to_dict()]
+            try:
+                response = await self._create_compiled(spec, sub_condition)
+            except QuotaExceeded as e:
+                logger.warning("Skipping subscription %r: %s", subscription, e)
+                return (False, subscription)
+            if response.status_code == 202:
+                return loads(response.content)["data"]
             return (False, subscription)
 
         # Use asyncio.gather to create all subscriptions concurrently
         results = await asyncio.gather(*(create_single_subscription(sub) for sub in subscriptions))
         return results
 
-    async def update_shards(self, shards):
-        """Update shards for a Conduit"""
+    async def _bulk_create_one(self, subscription, condition) -> "SubscriptionResult":
+        """Create one subscription for bulk_create_subscriptions, capturing any failure."""
+        result = SubscriptionResult(subscription, condition)
+        try:
+            spec, condition = compile_subscription(subscription, condition)
+        except ValueError as e:
+            result.error = str(e)
+            return result
+        existing = self.conduits.subscriptions.find(subscription, condition)
+        if existing is not None:
+            result.success = True
+            result.skipped = True
+            result.data = existing.to_dict()
+            result.cost = existing.cost
+            return result
+        try:
+            response = await self._create_compiled(spec, condition)
+        except QuotaExceeded as e:
+            result.error = str(e)
+            return result
+        except httpx.HTTPError as e:
+            result.error = f"{type(e).__name__}: {e}"
+            return result
+        result.status_code = response.status_code
+        try:
+            body = loads(response.content)
+        except ValueError:
+            body = {}
+        if response.status_code == 202:
+            result.success = True
+            result.data = body["data"][0]
+            result.cost = result.data.get("cost")
+        else:
+            result.error = body.get("message") or response.reason_phrase
+        return result
+
+    async def bulk_create_subscriptions(self, items, concurrency: int = 50):
+        """Create subscriptions from an iterable or async iterable of (type, condition) pairs.
+
+        At most `concurrency` requests are in flight and input is consumed lazily, so memory
+        stays flat regardless of input size. Yields a SubscriptionResult as each one completes.
+        Invalid subscriptions and ones that do not fit in the cost budget fail locally, and ones
+        already in the local index are reported as skipped, all without a request.
+        """
+        async for result in _bounded_as_completed(items, lambda pair: self._bulk_create_one(*pair), concurrency):
+            yield result
+
+    async def _patch_shards(self, shards):
+        """Send one shard update PATCH and return the response body."""
         url = "https://api.twitch.tv/helix/eventsub/conduits/shards"
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Client-Id": self.client_id,
             "Content-Type": "application/json"
         }
-        new_shards = [{key: value for key, value in s.items() if value is not None} for s in shards]
-        data = {"conduit_id": self.id, "shards": new_shards}
-        r = await send_request("PATCH", url, headers, json=data)
+        data = {"conduit_id": self.id, "shards": shards}
+        r = await self.conduits._send_request("PATCH", url, headers, json=data)
         if r.status_code == 202:
-            return r.json()
+            return loads(r.content)
         else:
             r.raise_for_status()
 
+    async def update_shards(self, shards, chunk_size: int = 100, concurrency: int = 5):
+        """Update shards for a Conduit
+
+        Shards are sent in PATCH requests of up to chunk_size shards, at most `concurrency` at a
+        time. Returns the merged "data" and "errors" arrays of all responses.
+        """
+        new_shards = [{key: value for key, value in s.items() if value is not None} for s in shards]
+        chunks = [new_shards[i:i + chunk_size] for i in range(0, len(new_shards), chunk_size)]
+        result = {"data": [], "errors": []}
+        async for r in _bounded_as_completed(chunks, self._patch_shards, concurrency):
+            result["data"].extend(r.get("data", []))
+            result["errors"].extend(r.get("errors", []))
+        return result
+
+    async def create_shards(self, keys, chunk_size: int = 100, concurrency: int = 5, max_attempts: int = 3):
+        """Create one new Shard per key with a single shard_count update and chunked shard PATCHes.
+
+        Shards reported in the response's "errors" array are retried alone, up to max_attempts.
+        All new shards are added to shards and shards_dict so shard IDs stay contiguous; ones that
+        still failed keep a status of None. Returns the new shards and the remaining errors.
+        """
+        keys = list(keys)
+        first = len(self.shards)
+        needed = first + len(keys)
+        if needed > self.shard_count and await self.update_conduit(needed) is None:
+            raise RuntimeError(f"Failed to grow conduit {self.id} to {needed} shards")
+
+        new_shards = [Shard(str(first + i), self.access_token, callback_url=self.callback_url, key=key)
+                      for i, key in enumerate(keys)]
+        by_id = {shard.id: shard for shard in new_shards}
+        pending = new_shards
+        errors = []
+        for _ in range(max_attempts):
+            result = await self.update_shards([shard.to_dict() for shard in pending], chunk_size, concurrency)
+            for data in result["data"]:
+                shard = by_id.get(str(data.get("id")))
+                if shard is not None:
+                    shard.update_from_dict(data)
+            errors = result["errors"]
+            failed = {str(e.get("id")) for e in errors}
+            pending = [shard for shard in pending if shard.id in failed]
+            if not pending:
+                break
+
+        for shard in new_shards:
+            self.shards.append(shard)
+            self.shards_dict[shard.transport.secret] = shard
+        logger.info("%d/%d shards created for conduit %s", len(new_shards) - len(pending), len(new_shards), self.id)
+        return new_shards, errors
+
 
 class Conduits:
     """This is for handling Twitch Conduit requests"""
-    def __init__(self, client_id, client_secret, callback_url):
+    def __init__(self, client_id, client_secret, callback_url, client: httpx.AsyncClient = None,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, http2: bool = None, rate_limiter: RateLimiter = None,
+                 retry_policy: RetryPolicy = None, metrics: RequestHooks = None, cost_tracker: CostTracker = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.callback_url = callback_url
         self.conduits: List[Conduit] = []
-        self.access_token = None
-        self.subscriptions = set()
+        self.token_manager = AppTokenManager(self._fetch_app_token)
+        self.subscriptions = SubscriptionIndex()
+        self._owns_client = client is None
+        self.client = client or create_client(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2
+        )
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Set to None to skip request instrumentation entirely
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.revalidation_task = None
+        self.startup_timings = {}
+        self.placement = ConduitPlacement(self)
+        self.costs = cost_tracker or CostTracker()
+        self.costs.on_change = self._report_cost
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the shared HTTP client if it was created by this instance."""
+        await self.token_manager.stop()
+        if self._owns_client and not self.client.is_closed:
+            await self.client.aclose()
+
+    @property
+    def access_token(self):
+        """The current app access token."""
+        return self.token_manager.token
+
+    @access_token.setter
+    def access_token(self, value):
+        self.token_manager.set_token(value)
+
+    async def _send_request(self, method: str, url: str, headers: Dict, json: Dict = None, params: Dict = None,
+                            rate_limited: bool = True):
+        """Send a request through the shared, connection-pooled client and the Helix rate limiter.
+
+        Authenticated requests always carry the live app token; a 401 refreshes it once and replays.
+        """
+        limiter = self.rate_limiter if rate_limited else None
+        authenticated = "Authorization" in headers
+        if authenticated:
+            token = await self.token_manager.get_token()
+            headers = {**headers, "Authorization": f"Bearer {token}"}
+        response = await send_request(method, url, headers, json=json, params=params, client=self.client,
+                                      limiter=limiter, retry_policy=self.retry_policy, metrics=self.metrics)
+        if authenticated and response.status_code == 401:
+            token = await self.token_manager.refresh(stale_token=token)
+            headers = {**headers, "Authorization": f"Bearer {token}"}
+            response = await send_request(method, url, headers, json=json, params=params, client=self.client,
+                                          limiter=limiter, retry_policy=self.retry_policy, metrics=self.metrics)
+        return response
+
+    def _report_cost(self, costs: CostTracker):
+        """Forward cost budget changes to the metrics hooks"""
+        cost_updated = getattr(self.metrics, "cost_updated", None)
+        if cost_updated is not None:
+            cost_updated(costs.total_cost, costs.max_total_cost, costs.headroom)
+
+    def find_shard(self, secret):
+        """Return the (Conduit, Shard) whose transport uses this secret, or None."""
+        for conduit in self.conduits:
+            shard = conduit.shards_dict.get(secret)
+            if shard is not None:
+                return conduit, shard
+        return None
 
     def _on_conduit_delete(self, conduit):
         """Handle a Conduit deletion event"""
         self.conduits.remove(conduit)
 
-    async def get_access_token(self):
-        """Retrieve an access token from Twitch"""
+    async def _fetch_app_token(self):
+        """Request a new app access token from Twitch"""
         url = "https://id.twitch.tv/oauth2/token"
         params = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
             "grant_type": "client_credentials"
         }
-        response = await send_request("POST", url, {}, params=params)
+        response = await self._send_request("POST", url, {}, params=params, rate_limited=False)
         if response.status_code == 200:
-            response = response.json()
-            self.access_token = response.get("access_token")
-            return self.access_token
+            return loads(response.content)
+        response.raise_for_status()
+
+    async def get_access_token(self):
+        """Retrieve an access token from Twitch"""
+        return await self.token_manager.refresh()
 
     async def get_conduits(self):
         """Retrieve a list of conduits"""
@@ -332,72 +1202,323 @@ class Conduits:
         }
         url = "https://api.twitch.tv/helix/eventsub/conduits"
 
-        response = await send_request("GET", url, headers)
-        response = response.json()
+        response = await self._send_request("GET", url, headers)
+        response = loads(response.content)
         conduits_data = response.get("data", [])
 
-        self.conduits = [Conduit(self, conduit["id"], conduit["shard_count"], self.access_token, self.client_id, self.callback_url)
-                         for conduit in conduits_data]
+        # Reuse Conduit objects we already hold so references (and restored shards) stay valid
+        existing = {conduit.id: conduit for conduit in self.conduits}
+        conduits = []
+        for data in conduits_data:
+            conduit = existing.get(data["id"])
+            if conduit is None:
+                conduit = Conduit(self, data["id"], data["shard_count"], self.access_token, self.client_id, self.callback_url)
+                conduit.on_delete = self._on_conduit_delete
+            else:
+                conduit.shard_count = data["shard_count"]
+            conduits.append(conduit)
+        self.conduits = conduits
 
         return self.conduits
     
     async def sync_subscriptions(self):
-        subs = await self.get_subscriptions()
-        self.subscriptions = set()
-        for s in subs:
-            self.subscriptions.add(s["id"])
+        """Rebuild the local subscription index from Twitch."""
+        subscriptions = SubscriptionIndex()
+        async for s in self.iter_subscriptions():
+            subscriptions.add_from_api(s)
+        self.subscriptions = subscriptions
 
-    async def get_subscriptions(self, user_id=None):
-        """Retrieve the list of subscriptions for the current Conduits."""
+    async def iter_subscription_pages(self, status=None, subscription_type=None, user_id=None):
+        """Yield raw Helix subscription pages, prefetching the next page while the current one is processed.
+
+        Helix accepts at most one of the status, subscription_type and user_id filters per request.
+        """
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Client-Id": self.client_id
         }
         url = "https://api.twitch.tv/helix/eventsub/subscriptions"
-        subscriptions = []
-        after = ""
+        filters = {"status": status, "type": subscription_type, "user_id": user_id}
+        filters = {k: v for k, v in filters.items() if v is not None}
 
-        while True:
-            params = {"after": after}
-            if user_id is not None:
-                params["user_id"] = user_id
-            response = await send_request("GET", url, headers, params=params)
-            response = response.json()
-            subscriptions.extend(response.get("data", []))
-            pagination = response.get("pagination", {})
-            after = pagination.get("cursor")
-            if not after:
-                break
-        
-        return subscriptions
+        async def fetch_page(after):
+            params = dict(filters)
+            if after:
+                params["after"] = after
+            response = await self._send_request("GET", url, headers, params=params)
+            if response.status_code != 200:
+                response.raise_for_status()
+            page = loads(response.content)
+            self.costs.update(page)
+            return page
 
-    async def delete_subscription(self, sub_id: str):
-        """Delete a specific subscription by ID."""
+        task = asyncio.ensure_future(fetch_page(None))
+        try:
+            while task is not None:
+                page = await task
+                after = page.get("pagination", {}).get("cursor")
+                task = asyncio.ensure_future(fetch_page(after)) if after else None
+                yield page
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def iter_subscriptions(self, status=None, subscription_type=None, user_id=None):
+        """Stream subscriptions one at a time without materializing the full list."""
+        async for page in self.iter_subscription_pages(status, subscription_type, user_id):
+            for subscription in page.get("data", []):
+                yield subscription
+
+    async def get_subscriptions(self, user_id=None, status=None, subscription_type=None):
+        """Retrieve the list of subscriptions for the current Conduits."""
+        return [s async for s in self.iter_subscriptions(status, subscription_type, user_id)]
+
+    async def _delete_subscription_request(self, sub_id: str):
+        """Send the DELETE for a subscription and drop it locally if it is gone."""
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Client-Id": self.client_id
         }
         url = f"https://api.twitch.tv/helix/eventsub/subscriptions?id={sub_id}"
 
-        response = await send_request("DELETE", url, headers)
-        if response.status_code ==  204:
-            self.subscriptions.remove(sub_id)
+        response = await self._send_request("DELETE", url, headers)
+        if response.status_code in {204, 404}:
+            subscription = self.subscriptions.discard(sub_id)
+            if response.status_code == 204:
+                self.costs.deleted(subscription.cost if subscription is not None else None)
+        return response
+
+    async def delete_subscription(self, sub_id: str):
+        """Delete a specific subscription by ID. A subscription that no longer exists counts as deleted."""
+        response = await self._delete_subscription_request(sub_id)
+        if response.status_code in {204, 404}:
             return True
         else:
-            print(f"Failed to delete subscription {sub_id}. Response: {response.json()}")
+            logger.warning("Failed to delete subscription %s: %s", sub_id, response.text)
             return False
-        
-    async def clean_up_subscriptions(self):
-        """Remove all non-enabled subscriptions concurrently."""
-        subscriptions = await self.get_subscriptions()
-        to_delete = [sub["id"] for sub in subscriptions if sub["status"] != "enabled"]
 
-        # Use asyncio.gather to delete all subscriptions concurrently
-        results = await asyncio.gather(*(self.delete_subscription(sub_id) for sub_id in to_delete))
+    async def clean_up_subscriptions(self, statuses=non_enabled_statuses, concurrency: int = 20,
+                                     max_passes: int = 3) -> "CleanupReport":
+        """Remove all non-enabled subscriptions with a bounded pool of delete workers.
+
+        Each status is listed with the Helix status filter and streamed to the workers. Because
+        deleting can shift cursor pages, a status is re-listed (up to max_passes) until no
+        unseen subscriptions remain.
+        """
+        report = CleanupReport()
+        started = time.monotonic()
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+
+        async def worker():
+            while True:
+                sub_id = await queue.get()
+                try:
+                    response = await self._delete_subscription_request(sub_id)
+                    if response.status_code == 204:
+                        report.deleted_ids.append(sub_id)
+                    elif response.status_code == 404:
+                        report.already_deleted += 1
+                    else:
+                        report.failed_ids.append(sub_id)
+                except httpx.HTTPError:
+                    report.failed_ids.append(sub_id)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        try:
+            for status in statuses:
+                status_started = time.monotonic()
+                seen = set()
+                try:
+                    for _ in range(max_passes):
+                        new = 0
+                        async for sub in self.iter_subscriptions(status=status):
+                            if sub["id"] not in seen:
+                                seen.add(sub["id"])
+                                new += 1
+                                await queue.put(sub["id"])
+                        await queue.join()
+                        if not new:
+                            break
+                except httpx.HTTPError as e:
+                    report.errors[status] = str(e)
+                    await queue.join()
+                if seen:
+                    report.found[status] = len(seen)
+                report.timings[status] = time.monotonic() - status_started
+        finally:
+            for task in workers:
+                task.cancel()
+        report.elapsed = time.monotonic() - started
+        return report
+
+    async def _live_subscriptions(self, user_ids, full_scan: bool, concurrency: int):
+        """Yield the live subscriptions whose broadcaster (see placement_key) is one of the given user IDs.
+
+        The Helix user_id filter also matches other user fields, such as moderator_user_id, so
+        those matches are dropped here.
+        """
+        if full_scan:
+            async for data in self.iter_subscriptions():
+                subscription = Subscription.from_api(data)
+                if placement_key(subscription.condition) in user_ids:
+                    yield subscription
+            return
+
+        async def fetch_user(user_id):
+            return [Subscription.from_api(data) async for data in self.iter_subscriptions(user_id=user_id)]
+
+        seen = set()
+        async for subscriptions in _bounded_as_completed(user_ids, fetch_user, concurrency):
+            for subscription in subscriptions:
+                if subscription.id not in seen and placement_key(subscription.condition) in user_ids:
+                    seen.add(subscription.id)
+                    yield subscription
+
+    async def plan_reconcile(self, desired: Dict, full_scan: bool = False, concurrency: int = 20) -> ReconcilePlan:
+        """Diff the desired subscriptions against Twitch and return the minimal plan.
+
+        `desired` maps broadcaster user IDs to iterables of (type, condition) pairs. Only those
+        broadcasters are touched; map one to an empty list to remove all of its subscriptions.
+        Live state is fetched per broadcaster, or with one full listing when full_scan is set.
+        """
+        plan = ReconcilePlan()
+        wanted = {}
+        for pairs in desired.values():
+            for subscription, condition in pairs:
+                try:
+                    _, condition = compile_subscription(subscription, condition)
+                except ValueError:
+                    plan.invalid.append((subscription, condition))
+                    continue
+                wanted.setdefault(condition_key(subscription, condition), (subscription, condition))
+
+        present = set()
+        async for live in self._live_subscriptions({str(user_id) for user_id in desired}, full_scan, concurrency):
+            key = condition_key(live.type, live.condition)
+            if key in wanted and live.status == "enabled" and key not in present:
+                present.add(key)
+                plan.unchanged += 1
+            else:
+                plan.to_delete.append(live.id)
+        plan.to_create = [pair for key, pair in wanted.items() if key not in present]
+        return plan
+
+    async def apply_reconcile(self, conduit: Conduit, plan: ReconcilePlan, concurrency: int = 20) -> ReconcilePlan:
+        """Apply a plan from plan_reconcile: deletes first, then creates on the given Conduit.
+
+        With conduit=None, new subscriptions are spread over all conduits by `placement`.
+        """
+        async def delete(sub_id):
+            try:
+                return sub_id, await self.delete_subscription(sub_id)
+            except httpx.HTTPError:
+                return sub_id, False
+
+        async for sub_id, success in _bounded_as_completed(plan.to_delete, delete, concurrency):
+            if success:
+                plan.deleted.append(sub_id)
+            else:
+                plan.failed.append(sub_id)
+        creator = conduit if conduit is not None else self
+        async for result in creator.bulk_create_subscriptions(plan.to_create, concurrency=concurrency):
+            if result.success:
+                plan.created.append(result.data["id"])
+            else:
+                plan.failed.append((result.type, result.condition, result.error))
+        plan.applied = True
+        return plan
 
-        # Filter and return the list of successfully deleted subscription IDs
-        deleted_ids = [sub_id for sub_id, success in zip(to_delete, results) if success]
-        return deleted_ids
+    async def reconcile(self, conduit: Conduit, desired: Dict, dry_run: bool = False, full_scan: bool = False,
+                        concurrency: int = 20) -> ReconcilePlan:
+        """Bring the subscriptions of the given broadcasters in line with the desired state.
+
+        With dry_run the plan is returned without making any changes.
+        """
+        plan = await self.plan_reconcile(desired, full_scan=full_scan, concurrency=concurrency)
+        if dry_run:
+            return plan
+        return await self.apply_reconcile(conduit, plan, concurrency=concurrency)
+
+    def predict_cost(self, items) -> int:
+        """Predicted total cost of creating the (type, condition) pairs that are not indexed yet."""
+        total = 0
+        for subscription, condition in items:
+            try:
+                _, condition = compile_subscription(subscription, condition)
+            except ValueError:
+                continue
+            if self.subscriptions.find(subscription, condition) is None:
+                total += self.costs.predict(condition, self.subscriptions)
+        return total
+
+    async def _place_one(self, subscription, condition) -> SubscriptionResult:
+        """Create one subscription on the conduit chosen by `placement`."""
+        try:
+            _, filtered = compile_subscription(subscription, condition)
+            existing = self.subscriptions.find(subscription, filtered)
+        except ValueError:
+            existing = None
+        conduit = self.placement.conduit(existing.conduit_id) if existing is not None else None
+        placed = conduit is None
+        if placed:
+            try:
+                conduit = self.placement.place(condition)
+            except ValueError as e:
+                result = SubscriptionResult(subscription, condition)
+                result.error = str(e)
+                return result
+        result = await conduit._bulk_create_one(subscription, condition)
+        if placed:
+            # place() assumed one point of cost; correct it, or undo the placement if nothing was created
+            if result.success and not result.skipped:
+                self.placement.costs[conduit.id] += (result.cost or 0) - 1
+            else:
+                self.placement.counts[conduit.id] -= 1
+                self.placement.costs[conduit.id] -= 1
+        return result
+
+    async def bulk_create_subscriptions(self, items, concurrency: int = 50):
+        """Like Conduit.bulk_create_subscriptions, but spreads subscriptions over all conduits.
+
+        Each subscription goes to the conduit that `placement` picks for its broadcaster
+        (see ConduitPlacement); ones already in the local index are reported as skipped.
+        """
+        self.placement.refresh()
+        async for result in _bounded_as_completed(items, lambda pair: self._place_one(*pair), concurrency):
+            yield result
+
+    async def rebalance(self, concurrency: int = 20, dry_run: bool = False) -> RebalancePlan:
+        """Move subscriptions to the conduits `placement` assigns them, e.g. after adding or draining a conduit.
+
+        Helix cannot move a subscription, so each move deletes it and recreates it with the
+        same type, version and condition on the target conduit; events for it may be missed
+        in between. Call sync_subscriptions() first if the local index may be stale.
+        """
+        plan = self.placement.plan_rebalance()
+        if dry_run:
+            return plan
+
+        async def move(item):
+            subscription, _, target = item
+            try:
+                if not await self.delete_subscription(subscription.id):
+                    return subscription.id, False
+                response = await self.placement.conduit(target).create_subscription(
+                    subscription.type, subscription.condition, version=subscription.version)
+            except (httpx.HTTPError, ValueError, QuotaExceeded):
+                return subscription.id, False
+            return subscription.id, response.status_code == 202
+
+        async for sub_id, success in _bounded_as_completed(plan.moves, move, concurrency):
+            if success:
+                plan.moved.append(sub_id)
+            else:
+                plan.failed.append(sub_id)
+        plan.applied = True
+        self.placement.refresh()
+        return plan
 
     async def create_conduit(self, shard_count: int = 1) -> Conduit:
         """Create a Conduit"""
@@ -408,10 +1529,10 @@ class Conduits:
         }
         url = "https://api.twitch.tv/helix/eventsub/conduits"
         data = {"shard_count": shard_count}
-        response = await send_request("POST", url, headers, json=data)
+        response = await self._send_request("POST", url, headers, json=data)
         if response.status_code == 200:
-            response = response.json()
-            print(f"Conduit created successfully: {response}")
+            response = loads(response.content)
+            logger.info("Conduit created: %s", response)
             conduit = Conduit(
                 conduits=self,
                 conduit_id=response["data"][0]["id"],
@@ -426,11 +1547,92 @@ class Conduits:
         else:
             response.raise_for_status()
 
-    async def start(self):
-        """Start the Conduits management by retrieving and refreshing Conduits and shards."""
-        await self.get_access_token()
-        await self.get_conduits()
-        for conduit in self.conduits:
-            await conduit.get_shards()
+    async def save_snapshot(self, path: str):
+        """Write conduit, shard and subscription state to a local snapshot file."""
+        state = {
+            "saved_at": time.time(),
+            "client_id": self.client_id,
+            "conduits": [
+                {"id": c.id, "shard_count": c.shard_count, "shards": [s.to_dict() for s in c.shards]}
+                for c in self.conduits
+            ],
+            "subscriptions": [s.to_dict() for s in self.subscriptions.by_id.values()]
+        }
+        await asyncio.get_running_loop().run_in_executor(None, write_snapshot, path, state)
+
+    async def load_snapshot(self, path: str, max_age: float = None) -> bool:
+        """Restore state from a snapshot file. Returns False if there is no usable snapshot."""
+        state = await asyncio.get_running_loop().run_in_executor(None, read_snapshot, path, max_age)
+        if state is None or state["client_id"] != self.client_id:
+            return False
+        conduits = []
+        for data in state["conduits"]:
+            conduit = Conduit(self, data["id"], data["shard_count"], self.access_token, self.client_id, self.callback_url)
             conduit.on_delete = self._on_conduit_delete
-        await self.sync_subscriptions()
\ No newline at end of file
+            for shard_data in data["shards"]:
+                transport_data = shard_data["transport"]
+                transport = Transport(callback_url=self.callback_url, secret=transport_data["secret"],
+                                      method=transport_data["method"], session_id=transport_data["session_id"])
+                shard = Shard(shard_id=shard_data["id"], access_token=self.access_token, callback_url=self.callback_url,
+                              transport=transport, session_id=shard_data["session_id"], status=shard_data["status"])
+                shard.update_from_dict(shard_data)
+                conduit.shards.append(shard)
+            conduit.make_dict()
+            conduits.append(conduit)
+        self.conduits = conduits
+        self.subscriptions = SubscriptionIndex(Subscription.from_api(s) for s in state["subscriptions"])
+        return True
+
+    async def _timed(self, phase: str, coro):
+        """Await coro and record its duration in startup_timings."""
+        started = time.monotonic()
+        try:
+            return await coro
+        finally:
+            self.startup_timings[phase] = time.monotonic() - started
+
+    async def _get_all_shards(self, concurrency: int):
+        """Fetch shards for every conduit with at most `concurrency` conduits in flight."""
+        async for _ in _bounded_as_completed(self.conduits, lambda conduit: conduit.get_shards(), concurrency):
+            pass
+
+    async def refresh_state(self, snapshot_path: str = None, concurrency: int = 10):
+        """Re-read conduits, shards and subscriptions from Twitch, then update the snapshot if a path is given.
+
+        Shards for all conduits and the subscription sync are fetched concurrently.
+        """
+        await self._timed("conduits", self.get_conduits())
+        await asyncio.gather(
+            self._timed("shards", self._get_all_shards(concurrency)),
+            self._timed("subscriptions", self.sync_subscriptions())
+        )
+        if snapshot_path:
+            await self._timed("save_snapshot", self.save_snapshot(snapshot_path))
+
+    async def start(self, snapshot_path: str = None, max_snapshot_age: float = None, concurrency: int = 10):
+        """Start the Conduits management by retrieving and refreshing Conduits and shards.
+
+        With a snapshot_path, state is restored from the snapshot when possible and revalidated
+        against Twitch in the background (see revalidation_task); the snapshot is rewritten afterwards.
+        Per-phase durations in seconds are recorded in startup_timings; when revalidating in the
+        background, its phases are added once they finish.
+        """
+        self.startup_timings = {}
+        started = time.monotonic()
+        try:
+            await self._timed("token", self.get_access_token())
+            self.token_manager.start()
+            restored = snapshot_path and await self._timed(
+                "load_snapshot", self.load_snapshot(snapshot_path, max_age=max_snapshot_age))
+            if restored:
+                self.revalidation_task = asyncio.ensure_future(self.refresh_state(snapshot_path, concurrency))
+                self.revalidation_task.add_done_callback(self._on_revalidated)
+                return
+            await self.refresh_state(snapshot_path, concurrency)
+        finally:
+            self.startup_timings["total"] = time.monotonic() - started
+
+    def _on_revalidated(self, task):
+        """Report a failed background revalidation"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Snapshot revalidation failed: %r", task.exception())
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AppTokenManager:
+    """Keeps an app access token fresh.
+
+    `fetch` is an async callable returning the token response dict (access_token, expires_in).
+    The expiry is tracked from expires_in, and the token is refreshed refresh_margin seconds
+    before it runs out, on demand through get_token() or in the background after start().
+    Concurrent refreshes are single-flight: every caller awaits the same request.
+    """
+    def __init__(self, fetch, refresh_margin: float = 300.0):
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.expires_at = 0.0
+        self.refreshes = 0
+        self._inflight = None
+        self._task = None
+
+    @property
+    def needs_refresh(self) -> bool:
+        """Whether the token is missing or within refresh_margin of expiring."""
+        return self.token is None or time.monotonic() >= self.expires_at - self.refresh_margin
+
+    def set_token(self, token, expires_in: float = None):
+        """Use a token obtained elsewhere. Without expires_in it is assumed valid until a 401."""
+        self.token = token
+        self.expires_at = time.monotonic() + expires_in if expires_in is not None else float("inf")
+
+    async def get_token(self):
+        """Return a valid token, refreshing it first if it is missing or about to expire."""
+        if self.needs_refresh:
+            return await self.refresh()
+        return self.token
+
+    async def refresh(self, stale_token=None):
+        """Fetch a new token, joining a refresh that is already running.
+
+        Pass the token a request was rejected with as stale_token: if it has already been
+        replaced, the current token is returned without another fetch.
+        """
+        if stale_token is not None and self.token is not None and self.token != stale_token:
+            return self.token
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._refresh())
+        inflight = self._inflight
+        try:
+            return await asyncio.shield(inflight)
+        finally:
+            if self._inflight is inflight and inflight.done():
+                self._inflight = None
+
+    async def _refresh(self):
+        data = await self.fetch()
+        self.set_token(data["access_token"], data.get("expires_in"))
+        self.refreshes += 1
+        return self.token
+
+    def start(self):
+        """Refresh proactively in the background before the token expires."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop background refreshing."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            delay = self.expires_at - self.refresh_margin - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(min(delay, 3600))
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("App token refresh failed: %r", e)
+                await asyncio.sleep(5)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ShardAutoscaler:
+    """Grows or shrinks a Conduit's shard_count to keep each shard under target_rate events/s.
+
+    Feed it with record() or wrap(); pass `provision` to add shards other than with create_shards.
+    """
+    def __init__(self, conduit, target_rate: float = 50.0, max_latency: float = 1.0, min_shards: int = 1,
+                 max_shards: int = 20000, interval: float = 30.0, window: float = 60.0, up_after: int = 2,
+                 down_after: int = 5, down_margin: float = 0.25, cooldown: float = 120.0, shard_key=None,
+                 provision=None):
+        self.conduit = conduit
+        self.target_rate = target_rate
+        self.max_latency = max_latency
+        self.min_shards = min_shards
+        self.max_shards = max_shards
+        self.interval = interval
+        self.window = window
+        self.up_after = up_after
+        self.down_after = down_after
+        self.down_margin = down_margin
+        self.cooldown = cooldown
+        self.shard_key = shard_key or (lambda index: f"{conduit.id}:{index}")
+        self.provision = provision
+        self.samples = deque()
+        # Events per shard within the window
+        self.shard_counts = {}
+        self._up_votes = 0
+        self._down_votes = 0
+        self._last_change = 0.0
+        self._task = None
+
+    def record(self, shard_id, latency: float):
+        """Record one handled event and how long its handler took."""
+        now = time.monotonic()
+        shard_id = str(shard_id)
+        self.samples.append((now, shard_id, latency))
+        self.shard_counts[shard_id] = self.shard_counts.get(shard_id, 0) + 1
+        self._trim(now)
+
+    def wrap(self, handler):
+        """Wrap an async event handler so every call is recorded."""
+        async def timed_handler(event):
+            started = time.monotonic()
+            try:
+                return await handler(event)
+            finally:
+                self.record(event.shard.id, time.monotonic() - started)
+        return timed_handler
+
+    def _trim(self, now: float):
+        while self.samples and self.samples[0][0] < now - self.window:
+            _, shard_id, _ = self.samples.popleft()
+            remaining = self.shard_counts[shard_id] - 1
+            if remaining:
+                self.shard_counts[shard_id] = remaining
+            else:
+                del self.shard_counts[shard_id]
+
+    def metrics(self):
+        """Current event rate and per-shard rates (events/s over the window), mean latency and shard count."""
+        self._trim(time.monotonic())
+        count = len(self.samples)
+        rate_by_shard = {shard_id: n / self.window for shard_id, n in self.shard_counts.items()}
+        return {
+            "rate": count / self.window,
+            "rate_by_shard": rate_by_shard,
+            "max_shard_rate": max(rate_by_shard.values(), default=0.0),
+            "latency": sum(latency for _, _, latency in self.samples) / count if count else 0.0,
+            "shard_count": self.conduit.shard_count
+        }
+
+    def desired_shards(self) -> int:
+        """Shard count the current load calls for, before hysteresis."""
+        metrics = self.metrics()
+        desired = math.ceil(metrics["rate"] / self.target_rate) if self.target_rate else self.conduit.shard_count
+        if metrics["latency"] > self.max_latency or (self.target_rate and metrics["max_shard_rate"] > self.target_rate):
+            desired = max(desired, self.conduit.shard_count + 1)
+        return min(self.max_shards, max(self.min_shards, desired))
+
+    async def evaluate(self):
+        """Run one scaling decision. Returns the new shard count, or None if nothing changed."""
+        current = self.conduit.shard_count
+        desired = self.desired_shards()
+        if desired > current:
+            self._up_votes += 1
+            self._down_votes = 0
+        elif desired < current * (1 - self.down_margin):
+            self._down_votes += 1
+            self._up_votes = 0
+        else:
+            self._up_votes = self._down_votes = 0
+            return None
+        if time.monotonic() - self._last_change < self.cooldown:
+            return None
+        if self._up_votes >= self.up_after:
+            changed = await self._scale_up(desired - current)
+        elif self._down_votes >= self.down_after:
+            changed = await self._scale_down(desired)
+        else:
+            return None
+        self._up_votes = self._down_votes = 0
+        if changed:
+            self._last_change = time.monotonic()
+            return self.conduit.shard_count
+        return None
+
+    async def _scale_up(self, count: int) -> bool:
+        if self.provision is not None:
+            await self.provision(self.conduit, count)
+            return True
+        previous = self.conduit.shard_count
+        first = len(self.conduit.shards)
+        try:
+            shards, errors = await self.conduit.create_shards([self.shard_key(first + i) for i in range(count)])
+        except Exception as e:
+            logger.warning("Autoscaler could not grow conduit %s: %r, rolling back", self.conduit.id, e)
+            await self.conduit.remove_shards(previous)
+            return False
+        if errors:
+            logger.warning("Autoscaler could not assign %d shards on conduit %s, rolling back", len(errors), self.conduit.id)
+            await self.conduit.remove_shards(previous)
+            return False
+        return True
+
+    async def _scale_down(self, count: int) -> bool:
+        return await self.conduit.remove_shards(count) is not None
+
+    def start(self):
+        """Start evaluating in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop evaluating."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.evaluate()
+            except Exception as e:
+                logger.warning("Autoscaler evaluation for conduit %s failed: %r", self.conduit.id, e)
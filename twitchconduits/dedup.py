@@ -0,0 +1,105 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Parse a Twitch RFC 3339 timestamp (nanosecond precision allowed) into epoch seconds."""
+    timestamp = timestamp.strip().replace("Z", "+00:00")
+    if "." in timestamp:
+        head, tail = timestamp.split(".", 1)
+        digits = len(tail) - len(tail.lstrip("0123456789"))
+        timestamp = f"{head}.{tail[:min(digits, 6)]:0<6}{tail[digits:]}"
+    parsed = datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class DedupBackend(ABC):
+    """Interface for message ID stores. Implement it to share deduplication between processes."""
+    @abstractmethod
+    async def add(self, message_id: str, ttl: float) -> bool:
+        """Record a message ID for ttl seconds. Return False if it was already recorded."""
+
+    @abstractmethod
+    async def discard(self, message_id: str):
+        """Forget a message ID."""
+
+
+class MemoryDedupBackend(DedupBackend):
+    """Bounded in-process message ID store with TTL eviction.
+
+    Entries are kept in insertion order, which with a fixed TTL is also expiry order, so expired
+    IDs are evicted from the front in amortized O(1). When full, the oldest ID is evicted.
+    """
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def _evict(self, now: float):
+        while self.entries:
+            message_id, expiry = next(iter(self.entries.items()))
+            if expiry > now and len(self.entries) < self.max_size:
+                break
+            self.entries.popitem(last=False)
+
+    async def add(self, message_id: str, ttl: float) -> bool:
+        now = time.monotonic()
+        expiry = self.entries.get(message_id)
+        if expiry is not None and expiry > now:
+            return False
+        self._evict(now)
+        self.entries.pop(message_id, None)
+        self.entries[message_id] = now + ttl
+        return True
+
+    async def discard(self, message_id: str):
+        self.entries.pop(message_id, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class MessageDeduplicator:
+    """Drops repeated Twitch-Eventsub-Message-Ids and messages older than the replay window.
+
+    Twitch asks receivers to reject messages whose timestamp is more than 10 minutes old, so the
+    default TTL matches the replay window: any retry young enough to pass the timestamp check is
+    still in the cache. Counters are exposed through stats().
+    """
+    def __init__(self, backend: DedupBackend = None, ttl: float = 600.0, replay_window: float = 600.0):
+        self.backend = backend if backend is not None else MemoryDedupBackend()
+        self.ttl = ttl
+        self.replay_window = replay_window
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    async def check(self, message_id: str, timestamp: str) -> str:
+        """Return "new", "duplicate" or "stale" for a message, recording it when new."""
+        try:
+            age = time.time() - parse_timestamp(timestamp)
+        except ValueError:
+            age = None
+        if age is None or age > self.replay_window:
+            self.stale += 1
+            return "stale"
+        if await self.backend.add(message_id, self.ttl):
+            self.misses += 1
+            return "new"
+        self.hits += 1
+        return "duplicate"
+
+    async def forget(self, message_id: str):
+        """Forget a message that was not processed, so a redelivery is accepted."""
+        await self.backend.discard(message_id)
+
+    def stats(self):
+        """Return the hit/miss/stale counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale
+        }
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def partition_key(event: dict) -> str:
+    """Key that keeps one broadcaster's events together, falling back to the shard ID."""
+    payload = event.get("payload", {})
+    for source in (payload.get("event") or {}, payload.get("subscription", {}).get("condition", {})):
+        for field in ("broadcaster_user_id", "to_broadcaster_user_id", "user_id"):
+            if source.get(field):
+                return source[field]
+    return f"shard:{event.get('shard_id')}"
+
+
+def shard_key(event: dict) -> str:
+    """Key that keeps each shard's events together, for partitioning by shard group."""
+    return f"shard:{event.get('shard_id')}"
+
+
+async def _run_partition(handler, events, max_pending: int, key_func):
+    """Event loop of one worker process: ordered per key, concurrent across keys."""
+    loop = asyncio.get_running_loop()
+    lanes = {}
+    pending = asyncio.Semaphore(max_pending)
+
+    async def lane(key, lane_queue):
+        while True:
+            event = lane_queue.get_nowait()
+            try:
+                await handler(event)
+            except Exception:
+                logger.exception("Event handler failed for message %s", event.get("message_id"))
+            finally:
+                pending.release()
+            if lane_queue.empty():
+                del lanes[key]
+                return
+
+    tasks = set()
+    while True:
+        await pending.acquire()
+        event = await loop.run_in_executor(None, events.get)
+        if event is None:
+            pending.release()
+            break
+        key = key_func(event)
+        if key in lanes:
+            lanes[key].put_nowait(event)
+        else:
+            lanes[key] = asyncio.Queue()
+            lanes[key].put_nowait(event)
+            task = asyncio.ensure_future(lane(key, lanes[key]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def _worker_main(handler, events, max_pending: int, key_func):
+    asyncio.run(_run_partition(handler, events, max_pending, key_func))
+
+
+class ProcessDispatcher:
+    """Spreads events over worker processes, each with its own event loop.
+
+    Events are partitioned by key_func (by broadcaster with partition_key, or by shard with
+    shard_key) with a stable hash, so events with the same key are always handled in order by
+    the same process while different keys run concurrently. Each process has a bounded queue; when it is full,
+    dispatch waits, which pushes back on the receiving side. `handler` must be a picklable,
+    module-level async function; it receives EventSubEvent.to_dict() dictionaries.
+    Pass dispatch as the handler of a WebhookReceiver or WebSocketConsumer.
+    """
+    def __init__(self, handler, processes: int = None, queue_size: int = 1000, max_pending: int = 1000,
+                 mp_context: str = "spawn", key_func=partition_key):
+        self.handler = handler
+        self.key_func = key_func
+        self.process_count = processes or multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.max_pending = max_pending
+        self.context = multiprocessing.get_context(mp_context)
+        self.queues = []
+        self.processes = []
+
+    def start(self):
+        """Start the worker processes."""
+        if self.processes:
+            return
+        for _ in range(self.process_count):
+            events = self.context.Queue(maxsize=self.queue_size)
+            process = self.context.Process(target=_worker_main, args=(self.handler, events, self.max_pending, self.key_func),
+                                           daemon=True)
+            process.start()
+            self.queues.append(events)
+            self.processes.append(process)
+
+    def partition(self, event: dict) -> int:
+        """Index of the worker process that handles an event."""
+        return zlib.crc32(self.key_func(event).encode()) % self.process_count
+
+    async def dispatch(self, event):
+        """Send an EventSubEvent (or its dict form) to its worker, waiting while that worker's queue is full."""
+        if not isinstance(event, dict):
+            event = event.to_dict()
+        events = self.queues[self.partition(event)]
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, events.put, event)
+
+    async def stop(self, timeout: float = 30.0):
+        """Let every worker finish the events it has queued, then wait for the processes to exit."""
+        loop = asyncio.get_running_loop()
+        for events in self.queues:
+            await loop.run_in_executor(None, events.put, None)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        self.queues = []
+        self.processes = []
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EventSubEvent:
+    """A verified EventSub notification or revocation received on a shard"""
+    def __init__(self, conduit, shard, message_id, message_type, timestamp, payload):
+        self.conduit = conduit
+        self.shard = shard
+        self.message_id = message_id
+        self.message_type = message_type
+        self.timestamp = timestamp
+        self.payload = payload
+
+    @property
+    def subscription_type(self):
+        """The EventSub subscription type of this event."""
+        return self.payload.get("subscription", {}).get("type")
+
+    def to_dict(self):
+        """Convert EventSubEvent to dict"""
+        return {
+            "conduit_id": self.conduit.id,
+            "shard_id": self.shard.id,
+            "message_id": self.message_id,
+            "message_type": self.message_type,
+            "timestamp": self.timestamp,
+            "payload": self.payload
+        }
+
+
+class EventQueue:
+    """Bounded queue drained into an async handler by a pool of worker tasks"""
+    def __init__(self, handler, queue_size: int = 10000, workers: int = 4):
+        self.handler = handler
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.worker_count = workers
+        self._workers = []
+
+    def start(self):
+        """Start the handler workers."""
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self, drain: bool = True):
+        """Stop the handler workers, optionally after the queue has been drained."""
+        if drain:
+            await self.queue.join()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def put(self, event: EventSubEvent, timeout: float = None) -> bool:
+        """Queue an event, waiting up to timeout seconds (forever if None) for space. Returns False on timeout."""
+        self.start()
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self.queue.put(event), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def _worker(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.handler(event)
+            except Exception:
+                logger.exception("Event handler failed for message %s", event.message_id)
+            finally:
+                self.queue.task_done()
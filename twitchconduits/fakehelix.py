@@ -0,0 +1,281 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+import httpx
+from .jsonutil import loads, dumps
+from .sub_versions import registry
+
+
+class FakeHelix:
+    """In-process fake of the Helix EventSub, conduit and OAuth token endpoints.
+
+    Serve it to a client with transport() (an httpx.MockTransport) or client(). It keeps
+    conduits, shards and subscriptions in memory, paginates listings with cursors, charges
+    subscription cost against max_total_cost and answers with Ratelimit-* headers from a
+    token bucket of rate_limit points per window (429 when it is empty). `latency` seconds
+    (plus up to `jitter`) are added to every response, and a share of `error_rate` requests
+    fail with a 503 before being applied. Webhook shards become enabled right away unless
+    verify_webhooks is False, in which case they stay pending verification.
+    """
+    def __init__(self, page_size: int = 100, rate_limit: int = 800, window: float = 60.0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, max_total_cost: int = 10000, token_ttl: int = 5000000,
+                 verify_webhooks: bool = True, seed: int = None):
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.window = window
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_total_cost = max_total_cost
+        self.token_ttl = token_ttl
+        self.verify_webhooks = verify_webhooks
+        self.random = random.Random(seed)
+        self.tokens = set()
+        self.conduits = OrderedDict()
+        self.shards = {}
+        self.subscriptions = OrderedDict()
+        self.subscription_keys = {}
+        # Subscription IDs in creation order; deleted ones are skipped, so cursors stay valid across deletes
+        self._order = []
+        self._total_cost = 0
+        self.requests = {}
+        self.points = float(rate_limit)
+        self._refilled = time.monotonic()
+
+    def transport(self) -> httpx.MockTransport:
+        """An httpx transport that routes requests to this fake."""
+        return httpx.MockTransport(self.handle)
+
+    def client(self, **kwargs) -> httpx.AsyncClient:
+        """An AsyncClient served by this fake."""
+        return httpx.AsyncClient(transport=self.transport(), **kwargs)
+
+    @property
+    def total_cost(self) -> int:
+        """Sum of the cost of all subscriptions."""
+        return self._total_cost
+
+    def add_conduit(self, shard_count: int = 0) -> dict:
+        """Create a conduit directly, without a request."""
+        conduit = {"id": str(uuid.uuid4()), "shard_count": shard_count}
+        self.conduits[conduit["id"]] = conduit
+        self.shards[conduit["id"]] = {}
+        return conduit
+
+    def add_subscriptions(self, count: int, subscription_type: str = "stream.online", status: str = "enabled",
+                          conduit_id: str = None, cost: int = 0, start: int = 1) -> list:
+        """Create `count` subscriptions directly, for consecutive broadcaster IDs from `start`."""
+        created = []
+        for user_id in range(start, start + count):
+            condition = {"broadcaster_user_id": str(user_id)}
+            created.append(self._add_subscription(subscription_type, registry[subscription_type].version, condition,
+                                                  conduit_id, status, cost))
+        return created
+
+    def _add_subscription(self, subscription_type, version, condition, conduit_id, status="enabled", cost=1):
+        subscription = {
+            "id": str(uuid.uuid4()),
+            "status": status,
+            "type": subscription_type,
+            "version": version,
+            "condition": condition,
+            "created_at": "2024-01-01T00:00:00Z",
+            "transport": {"method": "conduit", "conduit_id": conduit_id},
+            "cost": cost
+        }
+        self.subscriptions[subscription["id"]] = subscription
+        self._order.append(subscription["id"])
+        self._total_cost += cost
+        self.subscription_keys[self._key(subscription_type, condition)] = subscription["id"]
+        return subscription
+
+    @staticmethod
+    def _key(subscription_type, condition):
+        return subscription_type, tuple(sorted(condition.items()))
+
+    def _take_point(self):
+        now = time.monotonic()
+        self.points = min(float(self.rate_limit), self.points + (now - self._refilled) * self.rate_limit / self.window)
+        self._refilled = now
+        if self.points < 1:
+            return False
+        self.points -= 1
+        return True
+
+    def _rate_limit_headers(self):
+        reset = time.time() + (self.rate_limit - self.points) * self.window / self.rate_limit
+        return {
+            "Ratelimit-Limit": str(self.rate_limit),
+            "Ratelimit-Remaining": str(int(self.points)),
+            "Ratelimit-Reset": str(int(reset) + 1)
+        }
+
+    @staticmethod
+    def _response(status: int, body=None, headers=None) -> httpx.Response:
+        headers = dict(headers or {})
+        if body is None:
+            return httpx.Response(status, headers=headers)
+        headers["Content-Type"] = "application/json"
+        return httpx.Response(status, headers=headers, content=dumps(body))
+
+    def _error(self, status: int, message: str, headers=None) -> httpx.Response:
+        error = {400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 409: "Conflict",
+                 429: "Too Many Requests", 503: "Service Unavailable"}.get(status, "Error")
+        return self._response(status, {"error": error, "status": status, "message": message}, headers)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer one request."""
+        route = (request.method, request.url.host, request.url.path)
+        self.requests[route] = self.requests.get(route, 0) + 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if request.url.host == "id.twitch.tv":
+            return self._token(request)
+        if not self._take_point():
+            return self._error(429, "Too Many Requests", self._rate_limit_headers())
+        headers = self._rate_limit_headers()
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer ") or authorization[7:] not in self.tokens:
+            return self._error(401, "Invalid OAuth token", headers)
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self._error(503, "Service Unavailable", headers)
+        handler = self.routes.get((request.method, request.url.path))
+        if handler is None:
+            return self._error(404, "Not Found", headers)
+        params = {k: v for k, v in request.url.params.items() if v}
+        body = loads(request.content) if request.content else {}
+        status, response_body = handler(self, params, body)
+        return self._response(status, response_body, headers)
+
+    def _token(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if params.get("grant_type") not in {"client_credentials", "refresh_token"}:
+            return self._error(400, "unsupported grant_type")
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        body = {"access_token": token, "expires_in": self.token_ttl, "token_type": "bearer"}
+        if params.get("grant_type") == "refresh_token":
+            body["refresh_token"] = uuid.uuid4().hex
+            body["scope"] = []
+        return self._response(200, body)
+
+    def _page(self, items, params):
+        start = int(params.get("after", 0))
+        page = items[start:start + self.page_size]
+        end = start + len(page)
+        return page, ({"cursor": str(end)} if end < len(items) else {})
+
+    def _get_conduits(self, params, body):
+        return 200, {"data": list(self.conduits.values())}
+
+    def _create_conduit(self, params, body):
+        conduit = self.add_conduit(body.get("shard_count", 0))
+        return 200, {"data": [conduit]}
+
+    def _update_conduit(self, params, body):
+        conduit = self.conduits.get(body.get("id"))
+        if conduit is None:
+            return 404, {"error": "Not Found", "status": 404, "message": "conduit not found"}
+        conduit["shard_count"] = body["shard_count"]
+        shards = self.shards[conduit["id"]]
+        for shard_id in [s for s in shards if int(s) >= conduit["shard_count"]]:
+            del shards[shard_id]
+        return 200, {"data": [conduit]}
+
+    def _delete_conduit(self, params, body):
+        if self.conduits.pop(params.get("id"), None) is None:
+            return 404, {"error": "Not Found", "status": 404, "message": "conduit not found"}
+        del self.shards[params["id"]]
+        return 204, None
+
+    def _get_shards(self, params, body):
+        shards = self.shards.get(params.get("conduit_id"))
+        if shards is None:
+            return 404, {"error": "Not Found", "status": 404, "message": "conduit not found"}
+        items = [s for s in shards.values() if "status" not in params or s["status"] == params["status"]]
+        page, pagination = self._page(items, params)
+        return 200, {"data": page, "pagination": pagination}
+
+    def _update_shards(self, params, body):
+        conduit = self.conduits.get(body.get("conduit_id"))
+        if conduit is None:
+            return 404, {"error": "Not Found", "status": 404, "message": "conduit not found"}
+        data, errors = [], []
+        for shard in body.get("shards", []):
+            transport = dict(shard.get("transport", {}))
+            if int(shard["id"]) >= conduit["shard_count"]:
+                errors.append({"id": shard["id"], "message": "shard id out of range", "code": "invalid_parameter"})
+                continue
+            if transport.get("method") == "websocket":
+                status = "enabled"
+            else:
+                transport.pop("secret", None)
+                status = "enabled" if self.verify_webhooks else "webhook_callback_verification_pending"
+            record = {"id": str(shard["id"]), "status": status, "transport": transport}
+            self.shards[conduit["id"]][record["id"]] = record
+            data.append(record)
+        return 202, {"data": data, "errors": errors}
+
+    def _get_subscriptions(self, params, body):
+        if len({"status", "type", "user_id"} & set(params)) > 1:
+            return 400, {"error": "Bad Request", "status": 400, "message": "only one filter may be specified"}
+        if "status" in params:
+            def match(s):
+                return s["status"] == params["status"]
+        elif "type" in params:
+            def match(s):
+                return s["type"] == params["type"]
+        elif "user_id" in params:
+            def match(s):
+                return any(v == params["user_id"] for k, v in s["condition"].items() if k.endswith("user_id"))
+        else:
+            def match(s):
+                return True
+        position = int(params.get("after", 0))
+        page = []
+        while position < len(self._order) and len(page) < self.page_size:
+            subscription = self.subscriptions.get(self._order[position])
+            position += 1
+            if subscription is not None and match(subscription):
+                page.append(subscription)
+        pagination = {"cursor": str(position)} if position < len(self._order) else {}
+        return 200, {"data": page, "total": len(self.subscriptions), "total_cost": self.total_cost,
+                     "max_total_cost": self.max_total_cost, "pagination": pagination}
+
+    def _create_subscription(self, params, body):
+        spec = registry.get(body.get("type"))
+        condition = body.get("condition") or {}
+        if spec is None or str(body.get("version")) not in spec.versions or spec.validate(condition) is not None:
+            return 400, {"error": "Bad Request", "status": 400, "message": "invalid subscription"}
+        transport = body.get("transport", {})
+        if transport.get("method") != "conduit" or transport.get("conduit_id") not in self.conduits:
+            return 400, {"error": "Bad Request", "status": 400, "message": "invalid transport"}
+        if self._key(spec.type, condition) in self.subscription_keys:
+            return 409, {"error": "Conflict", "status": 409, "message": "subscription already exists"}
+        if self._total_cost + 1 > self.max_total_cost:
+            return 429, {"error": "Too Many Requests", "status": 429, "message": "max_total_cost exceeded"}
+        subscription = self._add_subscription(spec.type, str(body["version"]), condition, transport["conduit_id"])
+        return 202, {"data": [subscription], "total": len(self.subscriptions), "total_cost": self.total_cost,
+                     "max_total_cost": self.max_total_cost}
+
+    def _delete_subscription(self, params, body):
+        subscription = self.subscriptions.pop(params.get("id"), None)
+        if subscription is None:
+            return 404, {"error": "Not Found", "status": 404, "message": "subscription not found"}
+        self.subscription_keys.pop(self._key(subscription["type"], subscription["condition"]), None)
+        self._total_cost -= subscription["cost"]
+        return 204, None
+
+    routes = {
+        ("GET", "/helix/eventsub/conduits"): _get_conduits,
+        ("POST", "/helix/eventsub/conduits"): _create_conduit,
+        ("PATCH", "/helix/eventsub/conduits"): _update_conduit,
+        ("DELETE", "/helix/eventsub/conduits"): _delete_conduit,
+        ("GET", "/helix/eventsub/conduits/shards"): _get_shards,
+        ("PATCH", "/helix/eventsub/conduits/shards"): _update_shards,
+        ("GET", "/helix/eventsub/subscriptions"): _get_subscriptions,
+        ("POST", "/helix/eventsub/subscriptions"): _create_subscription,
+        ("DELETE", "/helix/eventsub/subscriptions"): _delete_subscription,
+    }
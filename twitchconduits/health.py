@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from .sub_versions import non_enabled_shard_statuses
+
+logger = logging.getLogger(__name__)
+
+# A freshly (re)issued webhook shard is pending until Twitch verifies it, so pending is not a failure
+FAILED_SHARD_STATUSES = tuple(s for s in non_enabled_shard_statuses if s != "webhook_callback_verification_pending")
+
+
+class ShardHealthMonitor:
+    """Background task that finds failed shards of a Conduit and reissues them.
+
+    Every `interval` seconds it lists only the non-enabled shards (one Helix status filter per
+    status) and re-sends the failed ones: each webhook shard gets its transport re-sent with
+    Conduit.update_shards, using the existing Transport or, with fresh_transport, a new secret.
+    Reissues back off exponentially per shard. WebSocket shards are only reported, since WebSocketConsumer reconnects them.
+    Status changes are passed to on_transition(shard, old_status, new_status) and counted in
+    stats().
+    """
+    def __init__(self, conduit, interval: float = 30.0, statuses=non_enabled_shard_statuses,
+                 heal_statuses=FAILED_SHARD_STATUSES, base_backoff: float = 5.0, max_backoff: float = 300.0,
+                 fresh_transport: bool = False, on_transition=None):
+        self.conduit = conduit
+        self.interval = interval
+        self.statuses = statuses
+        self.heal_statuses = heal_statuses
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.fresh_transport = fresh_transport
+        self.on_transition = on_transition
+        self.statuses_by_shard = {}
+        self.backoff = {}
+        self._shards = {}
+        self.transitions = 0
+        self.reissued = 0
+        self.reissue_failures = 0
+        self._task = None
+
+    def start(self):
+        """Start polling in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning("Shard health check for conduit %s failed: %r", self.conduit.id, e)
+            await asyncio.sleep(self.interval)
+
+    def _shard(self, shard_id):
+        return self._shards.get(str(shard_id))
+
+    def _transition(self, shard, status):
+        old = self.statuses_by_shard.get(str(shard.id), shard.status)
+        self.statuses_by_shard[str(shard.id)] = status
+        shard.status = status
+        if old != status:
+            self.transitions += 1
+            if self.on_transition is not None:
+                self.on_transition(shard, old, status)
+
+    async def check(self):
+        """Run one poll: record shard statuses and reissue failed shards that are due."""
+        self._shards = {str(shard.id): shard for shard in self.conduit.shards}
+        unhealthy = {}
+        for status in self.statuses:
+            for data in await self.conduit.fetch_shards(status):
+                unhealthy[str(data["id"])] = data["status"]
+
+        for shard_id in list(self.statuses_by_shard):
+            if shard_id not in unhealthy and self.statuses_by_shard[shard_id] != "enabled":
+                shard = self._shard(shard_id)
+                self.backoff.pop(shard_id, None)
+                if shard is not None:
+                    self._transition(shard, "enabled")
+
+        due = []
+        now = time.monotonic()
+        for shard_id, status in unhealthy.items():
+            shard = self._shard(shard_id)
+            if shard is None:
+                continue
+            self._transition(shard, status)
+            if status not in self.heal_statuses or shard.transport.method != "webhook":
+                continue
+            attempts, next_try = self.backoff.get(shard_id, (0, 0.0))
+            if now >= next_try:
+                self.backoff[shard_id] = (attempts + 1, now + min(self.max_backoff, self.base_backoff * 2 ** attempts))
+                due.append(shard)
+        if due:
+            await self._reissue(due)
+
+    async def _reissue(self, shards):
+        if self.fresh_transport:
+            for shard in shards:
+                self.conduit.shards_dict.pop(shard.transport.secret, None)
+                shard.transport = type(shard.transport)(self.conduit.callback_url, key=shard.key)
+                self.conduit.shards_dict[shard.transport.secret] = shard
+        result = await self.conduit.update_shards([{"id": str(s.id), "transport": s.transport.to_dict()} for s in shards])
+        for data in result["data"]:
+            shard = self._shard(data["id"])
+            if shard is not None:
+                self.reissued += 1
+                self._transition(shard, data.get("status", shard.status))
+        self.reissue_failures += len(result["errors"])
+
+    def stats(self):
+        """Return monitor counters and the number of shards currently failed."""
+        return {
+            "failed_shards": sum(1 for s in self.statuses_by_shard.values() if s in self.heal_statuses),
+            "transitions": self.transitions,
+            "reissued": self.reissued,
+            "reissue_failures": self.reissue_failures
+        }
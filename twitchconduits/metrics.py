@@ -0,0 +1,221 @@
+import bisect
+
+try:
+    from opentelemetry import metrics as otel_metrics
+except ImportError:
+    otel_metrics = None
+
+# Latency histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def endpoint(url: str) -> str:
+    """Label for a request URL: its path, without scheme, host or query string."""
+    path = url.split("://", 1)[-1]
+    slash = path.find("/")
+    path = path[slash:] if slash >= 0 else "/"
+    return path.split("?", 1)[0]
+
+
+class RequestHooks:
+    """Callbacks invoked by send_request; every method is a no-op here.
+
+    Subclass it, or pass any object with the same methods as `metrics`, to feed another
+    metrics system.
+    """
+    def request_started(self, method: str, endpoint: str):
+        """A request attempt is about to be sent."""
+
+    def request_finished(self, method: str, endpoint: str, status, elapsed: float):
+        """A request attempt finished with an HTTP status, or with an exception class name as status."""
+
+    def request_retried(self, method: str, endpoint: str, reason):
+        """A request attempt is going to be retried because of `reason` (a status code or exception class name)."""
+
+    def rate_limit_updated(self, remaining: int, limit: int = None):
+        """A response reported the remaining Helix rate limit points."""
+
+    def cost_updated(self, total_cost: int, max_total_cost: int = None, headroom: int = None):
+        """The subscription cost budget changed; headroom is what creates may still use."""
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class RequestMetrics(RequestHooks):
+    """In-memory request metrics with a Prometheus text exporter.
+
+    Records a latency histogram and status-code counts per (method, endpoint), retries by
+    reason, the in-flight request count, the last reported rate limit points and the
+    subscription cost budget. Serve
+    render() from your own HTTP endpoint, or mount the ASGI app returned by asgi_app().
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = "twitchconduits"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.latency = {}
+        self.statuses = {}
+        self.retries = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limit_remaining = None
+        self.rate_limit_limit = None
+        self.total_cost = None
+        self.max_total_cost = None
+        self.cost_headroom = None
+
+    def request_started(self, method, endpoint):
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight:
+            self.max_in_flight = self.in_flight
+
+    def request_finished(self, method, endpoint, status, elapsed):
+        self.in_flight -= 1
+        key = (method, endpoint)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = _Histogram(self.buckets)
+        histogram.counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+        histogram.sum += elapsed
+        histogram.count += 1
+        key = (method, endpoint, str(status))
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def request_retried(self, method, endpoint, reason):
+        key = (method, endpoint, str(reason))
+        self.retries[key] = self.retries.get(key, 0) + 1
+
+    def rate_limit_updated(self, remaining, limit=None):
+        self.rate_limit_remaining = remaining
+        if limit is not None:
+            self.rate_limit_limit = limit
+
+    def cost_updated(self, total_cost, max_total_cost=None, headroom=None):
+        self.total_cost = total_cost
+        self.max_total_cost = max_total_cost
+        self.cost_headroom = headroom
+
+    def reset(self):
+        """Clear all recorded values."""
+        self.__init__(self.buckets, self.prefix)
+
+    def to_dict(self):
+        """Return the metrics as plain data."""
+        return {
+            "latency": {
+                f"{method} {path}": {"count": h.count, "sum": h.sum,
+                                     "buckets": dict(zip(self.buckets + (float("inf"),), h.counts))}
+                for (method, path), h in self.latency.items()
+            },
+            "statuses": {f"{method} {path} {status}": n for (method, path, status), n in self.statuses.items()},
+            "retries": {f"{method} {path} {reason}": n for (method, path, reason), n in self.retries.items()},
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rate_limit_remaining": self.rate_limit_remaining,
+            "rate_limit_limit": self.rate_limit_limit,
+            "total_cost": self.total_cost,
+            "max_total_cost": self.max_total_cost,
+            "cost_headroom": self.cost_headroom
+        }
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        p = self.prefix
+        lines = [f"# HELP {p}_request_duration_seconds Helix request latency.",
+                 f"# TYPE {p}_request_duration_seconds histogram"]
+        for (method, path), h in sorted(self.latency.items()):
+            labels = f'method="{method}",endpoint="{path}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, h.counts):
+                cumulative += n
+                lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{p}_request_duration_seconds_sum{{{labels}}} {h.sum}")
+            lines.append(f"{p}_request_duration_seconds_count{{{labels}}} {h.count}")
+        lines += [f"# HELP {p}_responses_total Helix responses by status code.", f"# TYPE {p}_responses_total counter"]
+        for (method, path, status), n in sorted(self.statuses.items()):
+            lines.append(f'{p}_responses_total{{method="{method}",endpoint="{path}",status="{status}"}} {n}')
+        lines += [f"# HELP {p}_retries_total Helix request retries by reason.", f"# TYPE {p}_retries_total counter"]
+        for (method, path, reason), n in sorted(self.retries.items()):
+            lines.append(f'{p}_retries_total{{method="{method}",endpoint="{path}",reason="{reason}"}} {n}')
+        lines += [f"# HELP {p}_requests_in_flight Helix requests currently in flight.",
+                  f"# TYPE {p}_requests_in_flight gauge", f"{p}_requests_in_flight {self.in_flight}"]
+        if self.rate_limit_remaining is not None:
+            lines += [f"# HELP {p}_rate_limit_remaining Helix rate limit points left in the current window.",
+                      f"# TYPE {p}_rate_limit_remaining gauge", f"{p}_rate_limit_remaining {self.rate_limit_remaining}"]
+        if self.total_cost is not None:
+            lines += [f"# HELP {p}_subscription_cost Total cost of the EventSub subscriptions.",
+                      f"# TYPE {p}_subscription_cost gauge", f"{p}_subscription_cost {self.total_cost}"]
+        if self.max_total_cost is not None:
+            lines += [f"# HELP {p}_subscription_max_cost Maximum total subscription cost allowed by Helix.",
+                      f"# TYPE {p}_subscription_max_cost gauge", f"{p}_subscription_max_cost {self.max_total_cost}"]
+        if self.cost_headroom is not None:
+            lines += [f"# HELP {p}_subscription_cost_headroom Subscription cost still available to new creates.",
+                      f"# TYPE {p}_subscription_cost_headroom gauge",
+                      f"{p}_subscription_cost_headroom {self.cost_headroom}"]
+        return "\n".join(lines) + "\n"
+
+    def asgi_app(self):
+        """Return an ASGI app that serves render() on every GET request."""
+        async def app(scope, receive, send):
+            if scope["type"] != "http":
+                return
+            if scope["method"] != "GET":
+                status, body = 405, b""
+            else:
+                status, body = 200, self.render().encode()
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(b"content-type", b"text/plain; version=0.0.4")]})
+            await send({"type": "http.response.body", "body": body})
+        return app
+
+
+class OpenTelemetryHooks(RequestHooks):
+    """Records the same request metrics through an OpenTelemetry meter"""
+    def __init__(self, meter=None):
+        if otel_metrics is None:
+            raise ImportError("OpenTelemetryHooks requires the 'opentelemetry-api' package")
+        meter = meter or otel_metrics.get_meter("twitchconduits")
+        self.duration = meter.create_histogram("twitchconduits.request.duration", unit="s",
+                                               description="Helix request latency")
+        self.retries = meter.create_counter("twitchconduits.request.retries", description="Helix request retries")
+        self.in_flight = meter.create_up_down_counter("twitchconduits.requests.in_flight",
+                                                      description="Helix requests in flight")
+        self.rate_limit_remaining = None
+        self.cost_headroom = None
+        meter.create_observable_gauge("twitchconduits.rate_limit.remaining", callbacks=[self._observe_rate_limit],
+                                      description="Helix rate limit points left in the current window")
+        meter.create_observable_gauge("twitchconduits.subscription.cost_headroom", callbacks=[self._observe_headroom],
+                                      description="Subscription cost still available to new creates")
+
+    def _observe_rate_limit(self, options):
+        if self.rate_limit_remaining is None:
+            return []
+        return [otel_metrics.Observation(self.rate_limit_remaining)]
+
+    def _observe_headroom(self, options):
+        if self.cost_headroom is None:
+            return []
+        return [otel_metrics.Observation(self.cost_headroom)]
+
+    def request_started(self, method, endpoint):
+        self.in_flight.add(1, {"method": method, "endpoint": endpoint})
+
+    def request_finished(self, method, endpoint, status, elapsed):
+        self.in_flight.add(-1, {"method": method, "endpoint": endpoint})
+        self.duration.record(elapsed, {"method": method, "endpoint": endpoint, "status": str(status)})
+
+    def request_retried(self, method, endpoint, reason):
+        self.retries.add(1, {"method": method, "endpoint": endpoint, "reason": str(reason)})
+
+    def rate_limit_updated(self, remaining, limit=None):
+        self.rate_limit_remaining = remaining
+
+    def cost_updated(self, total_cost, max_total_cost=None, headroom=None):
+        self.cost_headroom = headroom
@@ -0,0 +1,253 @@
+import bisect
+import math
+import zlib
+
+
+def placement_key(condition: dict) -> str:
+    """Key a subscription is placed by: its broadcaster (or user) ID, like Subscription.user_id."""
+    return str(condition.get("broadcaster_user_id") or condition.get("user_id")
+               or condition.get("to_broadcaster_user_id") or condition.get("from_broadcaster_user_id") or "")
+
+
+class HashRing:
+    """Consistent hash ring with `replicas` virtual nodes per node"""
+    def __init__(self, nodes=(), replicas: int = 100):
+        self.replicas = replicas
+        self.nodes = set()
+        self._hashes = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return zlib.crc32(value.encode())
+
+    def add(self, node: str):
+        """Add a node; only about 1/len(nodes) of the keys move to it."""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            h = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._hashes, h)
+            self._hashes.insert(index, h)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        """Remove a node; only its keys move."""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        kept = [(h, owner) for h, owner in zip(self._hashes, self._owners) if owner != node]
+        self._hashes = [h for h, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def candidates(self, key: str):
+        """Yield the distinct nodes in ring order starting from the key's position."""
+        if not self._hashes:
+            return
+        start = bisect.bisect(self._hashes, self._hash(key))
+        seen = set()
+        for i in range(len(self._hashes)):
+            owner = self._owners[(start + i) % len(self._hashes)]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+                if len(seen) == len(self.nodes):
+                    return
+
+    def get(self, key: str):
+        """The node owning a key, or None if the ring is empty."""
+        return next(self.candidates(key), None)
+
+
+class RebalancePlan:
+    """Subscriptions to move between conduits, from ConduitPlacement.plan_rebalance"""
+    def __init__(self):
+        self.moves = []
+        self.unchanged = 0
+        self.moved = []
+        self.failed = []
+        self.applied = False
+
+    def to_dict(self):
+        """Convert RebalancePlan to dict"""
+        return {
+            "moves": [(subscription.id, source, target) for subscription, source, target in self.moves],
+            "unchanged": self.unchanged,
+            "moved": self.moved,
+            "failed": self.failed,
+            "applied": self.applied
+        }
+
+
+class ConduitPlacement:
+    """Places subscriptions on the conduits of a Conduits with bounded-load consistent hashing.
+
+    Subscriptions are placed per broadcaster (see placement_key): a broadcaster's first
+    subscription is hashed onto a ring of the active conduits and its later ones follow it, so
+    adding or draining a conduit only moves its share of broadcasters. No conduit takes more
+    than load_factor times the average subscription count or cost; overflow goes to the next
+    conduit on the ring.
+    """
+    def __init__(self, conduits, replicas: int = 100, load_factor: float = 1.25):
+        self.conduits = conduits
+        self.replicas = replicas
+        self.load_factor = load_factor
+        self.draining = set()
+        self.ring = HashRing(replicas=replicas)
+        self.counts = {}
+        self.costs = {}
+        self.assignments = {}
+
+    def active(self):
+        """The conduits that take new subscriptions."""
+        return [conduit for conduit in self.conduits.conduits if conduit.id not in self.draining]
+
+    @staticmethod
+    def _group_key(subscription) -> str:
+        # Subscriptions without a broadcaster (e.g. conduit or client_id conditions) are placed on their own
+        return placement_key(subscription.condition) or f"#{subscription.id}"
+
+    @staticmethod
+    def _home(subscriptions) -> str:
+        """The conduit holding most of a broadcaster's subscriptions, ties broken by conduit ID."""
+        held = {}
+        for subscription in subscriptions:
+            held[subscription.conduit_id] = held.get(subscription.conduit_id, 0) + 1
+        return min(held, key=lambda conduit_id: (-held[conduit_id], conduit_id))
+
+    def _groups(self, conduit_ids):
+        """Indexed subscriptions on the given conduits, grouped by broadcaster, in key order."""
+        groups = {}
+        for subscription in self.conduits.subscriptions.by_id.values():
+            if subscription.conduit_id in conduit_ids:
+                groups.setdefault(self._group_key(subscription), []).append(subscription)
+        return {key: sorted(groups[key], key=lambda subscription: subscription.id) for key in sorted(groups)}
+
+    def refresh(self):
+        """Sync the ring with the current conduits and recount their load from the local index."""
+        active = {conduit.id for conduit in self.active()}
+        for node in self.ring.nodes - active:
+            self.ring.remove(node)
+        for node in active - self.ring.nodes:
+            self.ring.add(node)
+        self.counts = dict.fromkeys(active, 0)
+        self.costs = dict.fromkeys(active, 0)
+        self.assignments = {}
+        for key, subscriptions in self._groups(active).items():
+            for subscription in subscriptions:
+                self.counts[subscription.conduit_id] += 1
+                self.costs[subscription.conduit_id] += subscription.cost or 0
+            if not key.startswith("#"):
+                self.assignments[key] = self._home(subscriptions)
+
+    def drain(self, conduit_id):
+        """Stop placing on a conduit; the next rebalance moves its subscriptions away."""
+        self.draining.add(conduit_id)
+        self.refresh()
+
+    def undrain(self, conduit_id):
+        """Place on a drained conduit again."""
+        self.draining.discard(conduit_id)
+        self.refresh()
+
+    def _caps(self, counts, costs, size, cost):
+        """Per-conduit count and cost limits once `size` subscriptions costing `cost` are added."""
+        nodes = len(counts)
+        return (math.ceil(self.load_factor * (sum(counts.values()) + size) / nodes),
+                math.ceil(self.load_factor * (sum(costs.values()) + cost) / nodes))
+
+    def _fits(self, node, counts, costs, size, cost, caps) -> bool:
+        count_cap, cost_cap = caps
+        return counts[node] + size <= count_cap and (not cost or costs[node] + cost <= cost_cap)
+
+    def _pick(self, key, counts, costs, size, cost, caps):
+        first = None
+        for node in self.ring.candidates(key):
+            if first is None:
+                first = node
+            if self._fits(node, counts, costs, size, cost, caps):
+                return node
+        return first
+
+    def place(self, condition: dict, cost: int = 1):
+        """Return the Conduit for a new subscription and count it against that conduit's load.
+
+        A broadcaster that already has a conduit stays on it; a new one is placed on the ring.
+        """
+        if not self.counts:
+            self.refresh()
+        if not self.counts:
+            raise ValueError("no active conduits to place subscriptions on")
+        key = placement_key(condition)
+        conduit_id = self.assignments.get(key)
+        if conduit_id not in self.counts:
+            conduit_id = self._pick(key, self.counts, self.costs, 1, cost, self._caps(self.counts, self.costs, 1, cost))
+            if key:
+                self.assignments[key] = conduit_id
+        self.counts[conduit_id] += 1
+        self.costs[conduit_id] += cost
+        return self.conduit(conduit_id)
+
+    def conduit(self, conduit_id):
+        """The Conduit object with an ID."""
+        for conduit in self.conduits.conduits:
+            if conduit.id == conduit_id:
+                return conduit
+        return None
+
+    def plan_rebalance(self) -> RebalancePlan:
+        """List the subscriptions that must move so every conduit is active and within its cap.
+
+        Broadcasters stay where most of their subscriptions are unless that conduit is drained or
+        over its cap; displaced broadcasters move as a whole. An unchanged set plans no moves.
+        """
+        self.refresh()
+        plan = RebalancePlan()
+        if not self.counts:
+            return plan
+        groups = self._groups({conduit.id for conduit in self.conduits.conduits})
+        counts = dict.fromkeys(self.counts, 0)
+        costs = dict.fromkeys(self.costs, 0)
+        caps = self._caps(counts, costs, sum(len(subs) for subs in groups.values()),
+                          sum(s.cost or 0 for subs in groups.values() for s in subs))
+        targets = {}
+        displaced = []
+        for key, subscriptions in groups.items():
+            home = self._home(subscriptions)
+            if home in counts:
+                targets[key] = home
+                counts[home] += len(subscriptions)
+                costs[home] += sum(s.cost or 0 for s in subscriptions)
+            else:
+                displaced.append(key)
+        for node in sorted(counts):
+            held = sorted((key for key, target in targets.items() if target == node),
+                          key=lambda key: (self.ring.get(key) == node, key))
+            # place() admits a broadcaster on its first subscription and its later ones follow,
+            # so a conduit may run over by one broadcaster's worth before it counts as over its cap
+            count_slack = max((len(groups[key]) - 1 for key in held), default=0)
+            cost_slack = max((sum(s.cost or 0 for s in groups[key]) for key in held), default=0)
+            for key in held:
+                if counts[node] <= caps[0] + count_slack and costs[node] <= caps[1] + cost_slack:
+                    break
+                del targets[key]
+                counts[node] -= len(groups[key])
+                costs[node] -= sum(s.cost or 0 for s in groups[key])
+                displaced.append(key)
+        for key in sorted(displaced):
+            size = len(groups[key])
+            cost = sum(s.cost or 0 for s in groups[key])
+            target = self._pick(key, counts, costs, size, cost, caps)
+            targets[key] = target
+            counts[target] += size
+            costs[target] += cost
+        for key, subscriptions in groups.items():
+            for subscription in subscriptions:
+                if subscription.conduit_id == targets[key]:
+                    plan.unchanged += 1
+                else:
+                    plan.moves.append((subscription, subscription.conduit_id, targets[key]))
+        return plan
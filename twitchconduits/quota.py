@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Mapping, Optional
+
+
+class QuotaExceeded(Exception):
+    """A subscription create was refused locally because it would exceed max_total_cost"""
+    def __init__(self, cost: int, headroom: int):
+        super().__init__(f"subscription cost {cost} exceeds the remaining budget of {headroom}")
+        self.cost = cost
+        self.headroom = headroom
+
+
+class CostTracker:
+    """Tracks the Helix subscription cost budget and admits creates against it.
+
+    total, total_cost and max_total_cost are taken from every subscription response that
+    carries them; deletes lower total_cost locally until the next response corrects it. Each
+    create reserves its predicted cost while in flight, so concurrent creates cannot overshoot
+    the budget together. When a create would not fit, acquire() raises QuotaExceeded, or with
+    `defer` waits up to that many seconds for headroom (a delete or a released reservation).
+    Until max_total_cost is known, everything is admitted.
+    """
+    def __init__(self, max_total_cost: int = None, margin: int = 0, defer: float = 0.0):
+        self.total = None
+        self.total_cost = 0
+        self.max_total_cost = max_total_cost
+        self.margin = margin
+        self.defer = defer
+        self.pending = 0
+        self.rejected = 0
+        self.updated_at = None
+        # Called with the tracker after every change; Conduits uses it to report metrics
+        self.on_change = None
+        self._changed = asyncio.Event()
+
+    @property
+    def headroom(self) -> Optional[int]:
+        """Cost that can still be admitted, or None while max_total_cost is unknown."""
+        if self.max_total_cost is None:
+            return None
+        return self.max_total_cost - self.margin - self.total_cost - self.pending
+
+    @staticmethod
+    def predict(condition: Mapping, subscriptions=None) -> int:
+        """Predicted cost of creating a subscription.
+
+        Helix charges nothing for subscriptions whose condition user has authorized the app,
+        so the cost is 0 if an indexed subscription for one of its users was free, else 1.
+        """
+        if subscriptions is not None:
+            for key, user_id in condition.items():
+                if not user_id or not key.endswith("user_id"):
+                    continue
+                for sub_id in subscriptions.by_user.get(user_id, ()):
+                    if subscriptions.by_id[sub_id].cost == 0:
+                        return 0
+        return 1
+
+    def fits(self, cost: int) -> bool:
+        """Whether a create of this cost would currently be admitted."""
+        headroom = self.headroom
+        return cost <= 0 or headroom is None or cost <= headroom
+
+    def try_acquire(self, cost: int) -> bool:
+        """Reserve `cost` if it fits, without waiting."""
+        if not self.fits(cost):
+            return False
+        self.pending += cost
+        self._notify()
+        return True
+
+    async def acquire(self, cost: int, defer: float = None):
+        """Reserve `cost` for an in-flight create, waiting up to `defer` seconds for headroom."""
+        defer = self.defer if defer is None else defer
+        deadline = time.monotonic() + defer
+        while not self.try_acquire(cost):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.rejected += 1
+                self._notify()
+                raise QuotaExceeded(cost, self.headroom)
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, cost: int):
+        """Drop a reservation made by acquire() once its request has finished."""
+        self.pending = max(self.pending - cost, 0)
+        self._notify()
+
+    def update(self, body: Mapping):
+        """Take total, total_cost and max_total_cost from a Helix subscription response body."""
+        if "total_cost" not in body:
+            return
+        self.total = body.get("total", self.total)
+        self.total_cost = body["total_cost"]
+        self.max_total_cost = body.get("max_total_cost", self.max_total_cost)
+        self.updated_at = time.time()
+        self._notify()
+
+    def deleted(self, cost: Optional[int]):
+        """Account for a deleted subscription until the next response reports the real totals."""
+        if self.total:
+            self.total -= 1
+        if cost:
+            self.total_cost = max(self.total_cost - cost, 0)
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def to_dict(self):
+        """Convert CostTracker to dict"""
+        return {
+            "total": self.total,
+            "total_cost": self.total_cost,
+            "max_total_cost": self.max_total_cost,
+            "pending": self.pending,
+            "headroom": self.headroom,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Mapping
+
+
+def reset_delay(headers: Mapping, default: float = 1.0) -> float:
+    """Return the number of seconds until the Ratelimit-Reset timestamp in headers."""
+    reset = headers.get("Ratelimit-Reset")
+    if reset is None:
+        return default
+    try:
+        return max(float(reset) - time.time(), 0.0)
+    except ValueError:
+        return default
+
+
+def bucket_empty(headers: Mapping) -> bool:
+    """Whether a response says the rate limit bucket is exhausted (Ratelimit-Remaining 0 or missing).
+
+    Helix also answers 429 when a subscription would exceed a cost or duplicate limit; those
+    come with points left and are not rate limiting.
+    """
+    remaining = headers.get("Ratelimit-Remaining")
+    if remaining is None:
+        return True
+    try:
+        return int(remaining) <= 0
+    except ValueError:
+        return True
+
+
+class RateLimiter:
+    """Token bucket that paces Helix requests using Twitch's Ratelimit-* headers.
+
+    The bucket refills continuously at limit / window points per second. Every response
+    corrects the local estimate with the server's Ratelimit-Remaining value, and an empty
+    bucket blocks until Ratelimit-Reset. Waiters are served in FIFO order.
+    """
+    def __init__(self, limit: int = 800, window: float = 60.0, margin: int = 1):
+        self.limit = limit
+        self.window = window
+        self.margin = margin
+        self.tokens = float(limit)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Points refilled per second."""
+        return self.limit / self.window
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(float(self.limit), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent and consume one point."""
+        async with self._lock:
+            while True:
+                wait = self.blocked_until - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                self._refill()
+                if self.tokens >= 1 + self.margin:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 + self.margin - self.tokens) / self.rate)
+
+    def update(self, headers: Mapping):
+        """Correct the bucket from a response's Ratelimit-* headers."""
+        limit = headers.get("Ratelimit-Limit")
+        remaining = headers.get("Ratelimit-Remaining")
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self._refill()
+            self.tokens = min(self.tokens, float(remaining))
+            if int(remaining) <= 0:
+                self.block(headers)
+
+    def block(self, headers: Mapping):
+        """Stop handing out points until the bucket resets."""
+        self._refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.time() + reset_delay(headers))
@@ -0,0 +1,72 @@
+import random
+import time
+from typing import Optional
+import httpx
+from .ratelimit import bucket_empty, reset_delay
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is retried.
+
+    Delays use exponential backoff with full jitter, capped by max_delay, and no retry is
+    scheduled that would end past the total deadline. Requests that may already have been
+    applied by Twitch (5xx responses, read timeouts, dropped connections) are only replayed
+    for idempotent methods, while failures that happen before the request is sent
+    (connect errors) and 429 responses are safe to retry for any method.
+    A 429 with an empty bucket (see bucket_empty) is retried at its Ratelimit-Reset time, which can be up to a minute away, so it does
+    not count as an attempt and is not bound by the deadline; up to max_rate_limit_retries of
+    them are retried, each waiting at most max_rate_limit_delay. Other 429s are not retried.
+    Subclass and override next_delay for custom behaviour.
+    """
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0,
+                 deadline: Optional[float] = 30.0, max_rate_limit_retries: int = 10,
+                 max_rate_limit_delay: float = 65.0,
+                 retry_statuses=frozenset({500, 502, 503, 504}),
+                 retry_exceptions=(httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError),
+                 safe_exceptions=(httpx.ConnectTimeout, httpx.ConnectError, httpx.PoolTimeout),
+                 idempotent_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"})):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.max_rate_limit_delay = max_rate_limit_delay
+        self.retry_statuses = retry_statuses
+        self.retry_exceptions = retry_exceptions
+        self.safe_exceptions = safe_exceptions
+        # Helix PATCH endpoints set absolute state (shard_count, shard transports), so replaying them is safe
+        self.idempotent_methods = idempotent_methods
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given 1-based attempt number."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def is_idempotent(self, method: str) -> bool:
+        """Whether a request with this method may be replayed after an ambiguous failure."""
+        return method.upper() in self.idempotent_methods
+
+    def next_delay(self, method: str, attempt: int, started: float, response: httpx.Response = None,
+                   exception: Exception = None, rate_limited: int = 0) -> Optional[float]:
+        """Return the delay before the next attempt, or None if the request should not be retried.
+
+        `attempt` counts the attempts that were not rate limited and `rate_limited` the 429s so far.
+        """
+        if response is not None and response.status_code == 429:
+            if not bucket_empty(response.headers) or rate_limited > self.max_rate_limit_retries:
+                return None
+            return min(reset_delay(response.headers), self.max_rate_limit_delay)
+        if attempt >= self.max_attempts:
+            return None
+        if response is not None:
+            if response.status_code in self.retry_statuses and self.is_idempotent(method):
+                delay = self.backoff(attempt)
+            else:
+                return None
+        elif isinstance(exception, self.safe_exceptions) or (
+                isinstance(exception, self.retry_exceptions) and self.is_idempotent(method)):
+            delay = self.backoff(attempt)
+        else:
+            return None
+        if self.deadline is not None and time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
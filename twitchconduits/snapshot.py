@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from .jsonutil import loads, dumps_str
+
+SNAPSHOT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE conduits (id TEXT PRIMARY KEY, shard_count INTEGER);
+CREATE TABLE shards (conduit_id TEXT, id TEXT, method TEXT, callback TEXT, secret TEXT, session_id TEXT,
+                     status TEXT, PRIMARY KEY (conduit_id, id));
+CREATE TABLE subscriptions (id TEXT PRIMARY KEY, type TEXT, version TEXT, condition TEXT, status TEXT,
+                            cost INTEGER, created_at TEXT, conduit_id TEXT);
+"""
+
+
+def write_snapshot(path: str, state: Dict):
+    """Atomically write conduit, shard and subscription state to an SQLite file.
+
+    The file holds webhook secrets, so it is created readable by the owner only.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        os.chmod(tmp_path, 0o600)
+        db.executescript(_SCHEMA)
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", str(SNAPSHOT_VERSION)),
+            ("saved_at", str(state.get("saved_at", time.time()))),
+            ("client_id", state.get("client_id", ""))
+        ])
+        for conduit in state["conduits"]:
+            db.execute("INSERT INTO conduits VALUES (?, ?)", (conduit["id"], conduit["shard_count"]))
+            db.executemany("INSERT INTO shards VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (conduit["id"], str(s["id"]), s["transport"]["method"], s["transport"].get("callback"),
+                 s["transport"].get("secret"), s["session_id"], s["status"])
+                for s in conduit["shards"]
+            ])
+        db.executemany("INSERT INTO subscriptions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+            (s["id"], s["type"], s["version"], dumps_str(s["condition"]), s["status"],
+             s["cost"], s["created_at"], s.get("conduit_id"))
+            for s in state["subscriptions"]
+        ))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, max_age: Optional[float] = None) -> Optional[Dict]:
+    """Read a snapshot written by write_snapshot, or return None if it is missing, unreadable or too old."""
+    if not os.path.exists(path):
+        return None
+    db = sqlite3.connect(path)
+    try:
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        if int(meta.get("version", 0)) != SNAPSHOT_VERSION:
+            return None
+        saved_at = float(meta["saved_at"])
+        if max_age is not None and time.time() - saved_at > max_age:
+            return None
+        conduits = {
+            conduit_id: {"id": conduit_id, "shard_count": shard_count, "shards": []}
+            for conduit_id, shard_count in db.execute("SELECT id, shard_count FROM conduits")
+        }
+        for conduit_id, shard_id, method, callback, secret, session_id, status in db.execute(
+                "SELECT conduit_id, id, method, callback, secret, session_id, status FROM shards "
+                "ORDER BY conduit_id, CAST(id AS INTEGER)"):
+            conduits[conduit_id]["shards"].append({
+                "id": shard_id,
+                "transport": {"method": method, "callback": callback, "secret": secret, "session_id": session_id},
+                "session_id": session_id,
+                "status": status
+            })
+        subscriptions = [
+            {"id": sub_id, "type": sub_type, "version": version, "condition": loads(condition),
+             "status": status, "cost": cost, "created_at": created_at,
+             "transport": {"method": "conduit", "conduit_id": conduit_id}}
+            for sub_id, sub_type, version, condition, status, cost, created_at, conduit_id in db.execute(
+                "SELECT id, type, version, condition, status, cost, created_at, conduit_id FROM subscriptions")
+        ]
+    except (sqlite3.DatabaseError, KeyError, ValueError):
+        return None
+    finally:
+        db.close()
+    return {
+        "saved_at": saved_at,
+        "client_id": meta.get("client_id", ""),
+        "conduits": list(conduits.values()),
+        "subscriptions": subscriptions
+    }
+
+
+class SQLiteStore:
+    """Minimal owner-only SQLite key/value store for JSON-serializable records
+
+    The connection may be used from any thread, one call at a time, so the batch methods can
+    run in an executor.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        new = not os.path.exists(path)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        if new:
+            os.chmod(path, 0o600)
+        self.db.execute("CREATE TABLE IF NOT EXISTS records (key TEXT PRIMARY KEY, value TEXT)")
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: Dict):
+        """Store a record, replacing any existing one."""
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, Dict]]):
+        """Store several records in one transaction."""
+        with self._lock:
+            self.db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)",
+                                ((key, dumps_str(value)) for key, value in items))
+            self.db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a record, or None if there is none."""
+        with self._lock:
+            row = self.db.execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+        return loads(row[0]) if row is not None else None
+
+    def delete_many(self, keys: Iterable[str]):
+        """Remove several records in one transaction."""
+        with self._lock:
+            self.db.executemany("DELETE FROM records WHERE key = ?", ((key,) for key in keys))
+            self.db.commit()
+
+    def pop(self, key: str) -> Optional[Dict]:
+        """Remove and return a record, or None if there is none."""
+        value = self.get(key)
+        if value is not None:
+            self.delete_many([key])
+        return value
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self.db.close()
@@ -1,3 +1,5 @@
+from typing import NamedTuple, Optional, Tuple
+
 sub_dict = {
     "automod.message.hold": {
         "version": 1,
@@ -384,4 +386,126 @@ sub_dict = {
         "conditions": [
             "user_id"
         ]},
-}
\ No newline at end of file
+}
+# Condition fields that may be omitted; a type with no required fields needs at least one of these
+optional_conditions = {
+    "channel.raid": ("from_broadcaster_user_id", "to_broadcaster_user_id"),
+    "channel.channel_points_custom_reward.update": ("reward_id",),
+    "channel.channel_points_custom_reward.remove": ("reward_id",),
+    "channel.channel_points_custom_reward_redemption.add": ("reward_id",),
+    "channel.channel_points_custom_reward_redemption.update": ("reward_id",),
+    "conduit.shard.disabled": ("conduit_id",),
+    "drop.entitlement.grant": ("category_id", "campaign_id"),
+}
+
+# Other versions Helix accepts besides the default version in sub_dict
+extra_versions = {
+    "automod.message.hold": ("2",),
+    "automod.message.update": ("2",),
+    "channel.update": ("1",),
+    "channel.moderate": ("1",),
+}
+
+
+class SubscriptionSpec(NamedTuple):
+    """Immutable description of one subscription type, compiled from sub_dict"""
+    type: str
+    version: str
+    versions: Tuple[str, ...]
+    required: Tuple[str, ...]
+    optional: Tuple[str, ...]
+    fields: Tuple[str, ...]
+
+    def condition(self, condition: dict) -> dict:
+        """Keep only the non-empty condition fields used by this type."""
+        result = {}
+        for field in self.fields:
+            value = condition.get(field)
+            if value:
+                result[field] = value
+        return result
+
+    def validate(self, condition: dict, version: Optional[str] = None) -> Optional[str]:
+        """Return why a filtered condition (and version) would be rejected by Helix, or None if it is valid."""
+        if version is not None and str(version) not in self.versions:
+            return f"unsupported version {version!r} for {self.type} (supported: {', '.join(self.versions)})"
+        missing = [field for field in self.required if field not in condition]
+        if missing:
+            return f"missing condition {', '.join(missing)} for {self.type}"
+        if not condition:
+            return f"{self.type} needs one of the conditions {', '.join(self.optional)}"
+        return None
+
+    def payload(self, condition: dict, transport: dict, version: Optional[str] = None) -> dict:
+        """Build a Helix create-subscription body from a filtered condition and a shared transport dict."""
+        return {
+            "type": self.type,
+            "version": self.version if version is None else str(version),
+            "condition": condition,
+            "transport": transport
+        }
+
+
+def _compile(subscription_type: str, spec: dict) -> SubscriptionSpec:
+    optional = optional_conditions.get(subscription_type, ())
+    required = tuple(field for field in spec["conditions"] if field not in optional)
+    fields = required + tuple(field for field in optional if field not in required)
+    version = str(spec["version"])
+    return SubscriptionSpec(subscription_type, version, (version,) + extra_versions.get(subscription_type, ()),
+                            required, optional, fields)
+
+
+# Compiled once at import; look types up here rather than in sub_dict
+registry = {subscription_type: _compile(subscription_type, spec) for subscription_type, spec in sub_dict.items()}
+
+
+def compile_subscription(subscription_type: str, condition: dict, version: Optional[str] = None):
+    """Validate a subscription locally and return its (spec, filtered condition).
+
+    Raises ValueError for unknown types, unsupported versions and missing conditions, so
+    invalid requests are never sent.
+    """
+    spec = registry.get(subscription_type)
+    if spec is None:
+        raise ValueError(f"unknown subscription type {subscription_type!r}")
+    condition = spec.condition(condition)
+    error = spec.validate(condition, version)
+    if error is not None:
+        raise ValueError(error)
+    return spec, condition
+
+
+# Subscription statuses other than "enabled", usable as Helix `status` filters
+non_enabled_statuses = (
+    "webhook_callback_verification_pending",
+    "webhook_callback_verification_failed",
+    "notification_failures_exceeded",
+    "authorization_revoked",
+    "moderator_removed",
+    "user_removed",
+    "chat_user_banned",
+    "version_removed",
+    "beta_maintenance",
+    "websocket_disconnected",
+    "websocket_failed_ping_pong",
+    "websocket_received_inbound_traffic",
+    "websocket_connection_unused",
+    "websocket_internal_error",
+    "websocket_network_timeout",
+    "websocket_network_error",
+    "websocket_failed_to_reconnect",
+)
+
+# Shard statuses other than "enabled", usable as Helix conduit shard `status` filters
+non_enabled_shard_statuses = (
+    "webhook_callback_verification_pending",
+    "webhook_callback_verification_failed",
+    "notification_failures_exceeded",
+    "websocket_disconnected",
+    "websocket_failed_ping_pong",
+    "websocket_received_inbound_traffic",
+    "websocket_internal_error",
+    "websocket_network_timeout",
+    "websocket_network_error",
+    "websocket_failed_to_reconnect",
+)
@@ -0,0 +1,131 @@
+import hashlib
+import hmac
+from .dedup import MessageDeduplicator
+from .jsonutil import loads
+from .events import EventSubEvent, EventQueue
+
+MESSAGE_ID = "twitch-eventsub-message-id"
+MESSAGE_TIMESTAMP = "twitch-eventsub-message-timestamp"
+MESSAGE_SIGNATURE = "twitch-eventsub-message-signature"
+MESSAGE_TYPE = "twitch-eventsub-message-type"
+
+
+def verify_signature(secret: str, message_id: str, timestamp: str, body: bytes, signature: str) -> bool:
+    """Check a Twitch-Eventsub-Message-Signature header using a constant-time compare."""
+    message = message_id.encode() + timestamp.encode() + body
+    expected = b"sha256=" + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest().encode()
+    # Compare bytes: compare_digest rejects non-ASCII str, and headers are decoded as latin-1
+    try:
+        return hmac.compare_digest(expected, signature.encode("latin-1"))
+    except UnicodeEncodeError:
+        return False
+
+
+class WebhookReceiver:
+    """ASGI app that receives EventSub webhooks for every shard of a Conduits instance.
+
+    The shard is found from the secret at the end of the callback path, the HMAC signature is
+    verified, challenges are answered, and notifications are acknowledged as soon as they are
+    queued. A pool of workers drains the bounded queue into `handler`, so slow handlers never
+    delay the acknowledgement. If the queue stays full for enqueue_timeout seconds the delivery
+    is refused with 503 and Twitch retries it later.
+
+    With a deduplicator, repeated message IDs are acknowledged without being queued again and
+    messages older than its replay window are rejected.
+    """
+    def __init__(self, conduits, handler, queue_size: int = 10000, workers: int = 4,
+                 enqueue_timeout: float = 1.0, max_body_size: int = 1024 * 1024,
+                 deduplicator: MessageDeduplicator = None):
+        self.conduits = conduits
+        self.deduplicator = deduplicator
+        self.events = EventQueue(handler, queue_size=queue_size, workers=workers)
+        self.enqueue_timeout = enqueue_timeout
+        self.max_body_size = max_body_size
+
+    def start(self):
+        """Start the handler workers."""
+        self.events.start()
+
+    async def stop(self, drain: bool = True):
+        """Stop the handler workers, optionally after the queue has been drained."""
+        await self.events.stop(drain)
+
+    async def handle(self, secret: str, headers, body: bytes):
+        """Process one delivery and return (status, content_type, response_body)."""
+        found = self.conduits.find_shard(secret)
+        if found is None:
+            return 404, "text/plain", b""
+        conduit, shard = found
+        message_id = headers.get(MESSAGE_ID, "")
+        timestamp = headers.get(MESSAGE_TIMESTAMP, "")
+        signature = headers.get(MESSAGE_SIGNATURE, "")
+        if not verify_signature(shard.transport.secret, message_id, timestamp, body, signature):
+            return 403, "text/plain", b""
+
+        message_type = headers.get(MESSAGE_TYPE, "")
+        try:
+            payload = loads(body)
+        except ValueError:
+            return 400, "text/plain", b""
+        if message_type == "webhook_callback_verification":
+            return 200, "text/plain", payload.get("challenge", "").encode()
+        if self.deduplicator is not None:
+            verdict = await self.deduplicator.check(message_id, timestamp)
+            if verdict == "duplicate":
+                return 204, "text/plain", b""
+            if verdict == "stale":
+                return 403, "text/plain", b""
+        if message_type == "revocation":
+            self.conduits.subscriptions.discard(payload.get("subscription", {}).get("id"))
+
+        event = EventSubEvent(conduit, shard, message_id, message_type, timestamp, payload)
+        if not await self.events.put(event, self.enqueue_timeout):
+            if self.deduplicator is not None:
+                await self.deduplicator.forget(message_id)
+            return 503, "text/plain", b""
+        return 204, "text/plain", b""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        if scope["method"] != "POST":
+            await self._respond(send, 405, "text/plain", b"")
+            return
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            more_body = message.get("more_body", False)
+            if len(body) > self.max_body_size:
+                await self._respond(send, 413, "text/plain", b"")
+                return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        secret = scope["path"].rstrip("/").rsplit("/", 1)[-1]
+        status, content_type, response_body = await self.handle(secret, headers, bytes(body))
+        await self._respond(send, status, content_type, response_body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _respond(send, status, content_type, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
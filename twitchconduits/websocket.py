@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import httpx
+from .dedup import MessageDeduplicator
+from .jsonutil import loads
+from .events import EventSubEvent, EventQueue
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+EVENTSUB_WEBSOCKET_URL = "wss://eventsub.wss.twitch.tv/ws"
+
+
+class WebSocketSession:
+    """A single EventSub WebSocket connection"""
+    def __init__(self, url: str = EVENTSUB_WEBSOCKET_URL, keepalive_grace: float = 2.0):
+        self.url = url
+        self.keepalive_grace = keepalive_grace
+        self.session_id = None
+        self.keepalive_timeout = None
+        self.connection = None
+
+    async def connect(self, welcome_timeout: float = 10.0):
+        """Open the connection and wait for the session_welcome message."""
+        if websockets is None:
+            raise ImportError("The WebSocket transport requires the 'websockets' package")
+        # Twitch's keepalive messages replace client pings, and it treats unexpected inbound traffic as an error
+        self.connection = await websockets.connect(self.url, ping_interval=None)
+        try:
+            message = loads(await asyncio.wait_for(self.connection.recv(), welcome_timeout))
+            if message["metadata"]["message_type"] != "session_welcome":
+                raise ConnectionError(f"Expected session_welcome, got {message['metadata']['message_type']}")
+        except BaseException:
+            await self.close()
+            raise
+        session = message["payload"]["session"]
+        self.session_id = session["id"]
+        self.keepalive_timeout = session.get("keepalive_timeout_seconds") or 10
+        return self
+
+    async def receive(self, timeout: float = None) -> dict:
+        """Return the next message.
+
+        Raises asyncio.TimeoutError when nothing, not even a keepalive, arrives within the
+        keepalive window (or `timeout`).
+        """
+        if timeout is None:
+            timeout = self.keepalive_timeout + self.keepalive_grace
+        return loads(await asyncio.wait_for(self.connection.recv(), timeout))
+
+    async def close(self):
+        """Close the connection."""
+        if self.connection is not None:
+            await self.connection.close()
+
+
+class WebSocketShard:
+    """Keeps one conduit shard assigned to a live EventSub WebSocket session.
+
+    On session_reconnect the new URL is connected before the old connection is drained and
+    closed, so no events are lost; events delivered on both are dropped by the deduplicator.
+    A missed keepalive or a dropped connection opens a fresh session and reassigns the shard.
+    """
+    def __init__(self, conduit, shard, events: EventQueue, deduplicator: MessageDeduplicator = None,
+                 url: str = EVENTSUB_WEBSOCKET_URL, keepalive_timeout: int = 10, keepalive_grace: float = 2.0,
+                 failover_delay: float = 1.0):
+        if websockets is None:
+            raise ImportError("The WebSocket transport requires the 'websockets' package")
+        self.conduit = conduit
+        self.shard = shard
+        self.events = events
+        self.deduplicator = deduplicator or MessageDeduplicator()
+        self.url = f"{url}?keepalive_timeout_seconds={keepalive_timeout}"
+        self.keepalive_grace = keepalive_grace
+        self.failover_delay = failover_delay
+        self.session = None
+        self.reconnects = 0
+        self.failovers = 0
+
+    @staticmethod
+    def _errors():
+        """Failures that a fresh session may recover from: connection problems and Helix errors while assigning."""
+        return OSError, asyncio.TimeoutError, ConnectionError, httpx.HTTPError, websockets.WebSocketException
+
+    async def _open(self, url: str) -> WebSocketSession:
+        return await WebSocketSession(url, keepalive_grace=self.keepalive_grace).connect()
+
+    async def _open_assigned(self, url: str, current: WebSocketSession = None) -> WebSocketSession:
+        """Open a session and assign the shard to it unless it continues `current`; closes it if that fails."""
+        session = await self._open(url)
+        if current is None or session.session_id != current.session_id:
+            try:
+                await self._assign(session)
+            except BaseException:
+                await session.close()
+                raise
+        return session
+
+    async def _assign(self, session: WebSocketSession):
+        """Point the shard at a session through Conduit.update_shards."""
+        transport = {"method": "websocket", "session_id": session.session_id}
+        result = await self.conduit.update_shards([{"id": self.shard.id, "transport": transport}])
+        if result["errors"]:
+            raise ConnectionError(f"Failed to assign shard {self.shard.id}: {result['errors'][0].get('message')}")
+        self.shard.transport.method = "websocket"
+        self.shard.transport.session_id = session.session_id
+        self.shard.session_id = session.session_id
+        for data in result["data"]:
+            self.shard.update_from_dict(data)
+
+    async def _dispatch(self, message: dict):
+        metadata = message["metadata"]
+        message_type = metadata["message_type"]
+        if message_type not in {"notification", "revocation"}:
+            return
+        if await self.deduplicator.check(metadata["message_id"], metadata["message_timestamp"]) != "new":
+            return
+        if message_type == "revocation":
+            self.conduit.conduits.subscriptions.discard(message["payload"].get("subscription", {}).get("id"))
+        event = EventSubEvent(self.conduit, self.shard, metadata["message_id"], message_type,
+                              metadata["message_timestamp"], message["payload"])
+        await self.events.put(event)
+
+    async def _drain(self, session: WebSocketSession):
+        """Dispatch whatever is still buffered on a connection being replaced, then close it."""
+        try:
+            while True:
+                await self._dispatch(await session.receive(timeout=0.5))
+        except (asyncio.TimeoutError, websockets.ConnectionClosed):
+            pass
+        finally:
+            await session.close()
+
+    async def _failover(self):
+        """Replace a dead session with a new one on the default URL."""
+        self.failovers += 1
+        while True:
+            try:
+                self.session = await self._open_assigned(self.url)
+                return
+            except self._errors() as e:
+                logger.warning("WebSocket failover for shard %s failed: %r", self.shard.id, e)
+                await asyncio.sleep(self.failover_delay)
+
+    async def run(self):
+        """Serve the shard until cancelled."""
+        await self._failover()
+        self.failovers = 0
+        try:
+            while True:
+                try:
+                    message = await self.session.receive()
+                except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                    logger.warning("WebSocket session %s for shard %s lost, failing over", self.session.session_id, self.shard.id)
+                    await self.session.close()
+                    await self._failover()
+                    continue
+
+                if message["metadata"]["message_type"] == "session_reconnect":
+                    self.reconnects += 1
+                    old = self.session
+                    try:
+                        self.session = await self._open_assigned(message["payload"]["session"]["reconnect_url"], old)
+                    except self._errors() as e:
+                        logger.warning("WebSocket reconnect for shard %s failed: %r", self.shard.id, e)
+                        await old.close()
+                        await self._failover()
+                        continue
+                    await self._drain(old)
+                else:
+                    await self._dispatch(message)
+        finally:
+            if self.session is not None:
+                await self.session.close()
+
+
+class WebSocketConsumer:
+    """Serves the shards of a Conduit over EventSub WebSockets, with no public ingress needed"""
+    def __init__(self, conduit, handler, shard_ids=None, queue_size: int = 10000, workers: int = 4,
+                 deduplicator: MessageDeduplicator = None, **shard_options):
+        self.conduit = conduit
+        self.shard_ids = shard_ids
+        self.events = EventQueue(handler, queue_size=queue_size, workers=workers)
+        self.deduplicator = deduplicator or MessageDeduplicator()
+        self.shard_options = shard_options
+        self.shards = []
+        self._tasks = []
+
+    def _shard(self, shard_id):
+        """Find or create the local Shard for a shard ID."""
+        for shard in self.conduit.shards:
+            if str(shard.id) == str(shard_id):
+                return shard
+        shard = self.conduit.new_websocket_shard(str(shard_id))
+        self.conduit.shards.append(shard)
+        return shard
+
+    def start(self):
+        """Open a session for every shard (all of the Conduit's shard slots by default)."""
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.conduit.shard_count)
+        self.events.start()
+        for shard_id in shard_ids:
+            runner = WebSocketShard(self.conduit, self._shard(shard_id), self.events, self.deduplicator,
+                                    **self.shard_options)
+            self.shards.append(runner)
+            task = asyncio.ensure_future(runner.run())
+            task.add_done_callback(lambda task, runner=runner: self._on_runner_done(runner, task))
+            self._tasks.append(task)
+
+    @staticmethod
+    def _on_runner_done(runner: WebSocketShard, task):
+        """Report a shard runner that stopped with an error"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("WebSocket runner for shard %s crashed: %r", runner.shard.id, task.exception())
+
+    async def stop(self, drain: bool = True):
+        """Close all sessions and stop the handler workers."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.events.stop(drain)